@@ -1,8 +1,22 @@
-from .planner import Planner
-from .reasoner import Reasoner
-from .evaluator import Evaluator
-from .loop import AgentLoop
-from .verifier import Verifier
-from .memory import Memory
+from importlib import import_module
+
+# 名稱 -> 所在模組；多數模組會連帶載入 LLM SDK，用到時才 import
+_EXPORTS = {
+    "Planner": ".planner",
+    "Reasoner": ".reasoner",
+    "Evaluator": ".evaluator",
+    "AgentLoop": ".loop",
+    "Verifier": ".verifier",
+    "Memory": ".memory",
+}
 
 __all__ = ["Planner", "Reasoner", "Evaluator", "AgentLoop", "Verifier", "Memory"]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -4,6 +4,7 @@ Coder Agent - 程式碼生成 Agent
 """
 import json
 import os
+from functools import lru_cache
 from typing import Optional, Generator
 from openai import OpenAI
 from dotenv import load_dotenv
@@ -11,6 +12,15 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+@lru_cache(maxsize=1)
+def _shared_client() -> OpenAI:
+    """所有 Coder 共用同一個 OpenAI client（連線池跨連線重用）"""
+    return OpenAI(
+        api_key=os.getenv("DEEPSEEK_API_KEY"),
+        base_url="https://api.deepseek.com/v1"
+    )
+
+
 class Coder:
     """
     程式碼生成 Agent
@@ -19,10 +29,8 @@ class Coder:
 
     def __init__(self, model: str = "deepseek-chat"):
         self.model = model
-        self.client = OpenAI(
-            api_key=os.getenv("DEEPSEEK_API_KEY"),
-            base_url="https://api.deepseek.com/v1"
-        )
+        self.client = _shared_client()
+        # 對話紀錄屬於單一連線，Coder 本身不能跨連線共用
         self.conversation_history = []
 
     def _call_llm(self, messages: list, stream: bool = False):
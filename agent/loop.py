@@ -33,7 +33,8 @@ class AgentLoop:
         evaluator: Evaluator,
         verifier: Verifier,
         max_iterations: int = 20,
-        ui = None  # MonusUI 實例（可選）
+        ui = None,  # MonusUI 實例（可選）
+        browser_pool = None  # 預熱的 BrowserPool（可選），有的話不必冷啟動 Chromium
     ):
         self.memory = memory
         self.planner = planner
@@ -47,7 +48,7 @@ class AgentLoop:
         self.renderer = Renderer()
 
         # 初始化工具
-        self.browser = BrowserTool()
+        self.browser = BrowserTool(pool=browser_pool)
         self.fs = FileTool()
         self.code = CodeTool()
         self.pdf = PDFTool()
@@ -296,7 +297,7 @@ class AgentLoop:
             elif tool == "fs.write":
                 parts = input_data.split("|", 1)
                 if len(parts) == 2:
-                    return self.fs.write(parts[0], parts[1])
+                    return await self.fs.awrite(parts[0], parts[1])
                 return {"success": False, "error": "Invalid fs.write format"}
 
             elif tool == "code.run":
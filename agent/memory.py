@@ -3,16 +3,21 @@ Memory - 任務狀態存取
 這是 Monus 的外接大腦，不依賴 prompt 記憶
 """
 import json
+import sqlite3
 from pathlib import Path
 from datetime import datetime
 from typing import Any, Optional
 import re
 
+from .run_index import RunIndex, get_run_index
+
 
 class Memory:
-    def __init__(self, runs_dir: str = "runs"):
+    def __init__(self, runs_dir: str = "runs", run_index: Optional[RunIndex] = None):
         self.runs_dir = Path(runs_dir)
         self.runs_dir.mkdir(exist_ok=True)
+        # 執行記錄索引由呼叫端注入（web server），否則用同一個 runs 目錄共用的那一份
+        self.index = run_index if run_index is not None else get_run_index(self.runs_dir)
         self.current_run: Optional[Path] = None
         self.task_state: dict = {}
 
@@ -47,6 +52,7 @@ class Memory:
         }
 
         self._save_task()
+        self._update_index()
         self._log(f"Task created: {goal}")
 
         return run_id
@@ -60,6 +66,17 @@ class Memory:
                 encoding="utf-8"
             )
 
+    def _update_index(self):
+        """
+        更新執行記錄索引；只在建立與狀態改變時呼叫，不必每次存檔都寫 sqlite、掃描目錄
+        索引只是快取，失敗不影響任務本身
+        """
+        if self.current_run:
+            try:
+                self.index.update_from_dir(self.current_run, self.task_state)
+            except (OSError, sqlite3.Error):
+                pass
+
     def load_run(self, run_id: str) -> dict:
         """載入現有的執行記錄"""
         self.current_run = self.runs_dir / run_id
@@ -163,6 +180,7 @@ class Memory:
         """設定任務狀態"""
         self.task_state["status"] = status
         self._save_task()
+        self._update_index()
         self._log(f"Task status: {status}")
 
     def save_sources_json(self):
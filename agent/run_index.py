@@ -0,0 +1,188 @@
+"""
+RunIndex - 執行記錄索引
+把每個 run 的摘要存進 .monus/runs.db（SQLite），列出最近執行記錄時不必掃描整個 runs/
+索引只是快取，檔案系統才是真實來源：索引壞掉或不見時可用 reindex() 從 runs/ 重建
+"""
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Optional
+
+# 索引放在 runs/ 旁邊的 .monus/ 下：runs/ 整個目錄會以 /runs 對外提供，不能放在裡面
+INDEX_DIRNAME = ".monus"
+INDEX_FILENAME = "runs.db"
+
+# 執行記錄中的輸出檔案：(類型, 檔名)
+RUN_OUTPUTS = (
+    ("pdf", "report.pdf"),
+    ("slides", "slides.html"),
+    ("web", "index.html"),
+    ("markdown", "report.md"),
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    goal TEXT,
+    status TEXT,
+    created_at TEXT,
+    outputs_json BLOB,
+    steps_count INTEGER,
+    mtime INTEGER
+)
+"""
+
+_UPSERT = """
+INSERT INTO runs (id, goal, status, created_at, outputs_json, steps_count, mtime)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+    goal = excluded.goal,
+    status = excluded.status,
+    created_at = excluded.created_at,
+    outputs_json = excluded.outputs_json,
+    steps_count = excluded.steps_count,
+    mtime = excluded.mtime
+"""
+
+
+def collect_outputs(run_dir: Path) -> dict:
+    """一次 scandir 列出執行目錄，找出存在的輸出檔案"""
+    with os.scandir(run_dir) as it:
+        names = {e.name for e in it}
+    run_name = run_dir.name
+    return {
+        kind: f"/runs/{run_name}/{filename}"
+        for kind, filename in RUN_OUTPUTS if filename in names
+    }
+
+
+class RunIndex:
+    def __init__(self, runs_dir, db_path=None):
+        self.runs_dir = Path(runs_dir)
+        if db_path is None:
+            db_path = self.runs_dir.absolute().parent / INDEX_DIRNAME / INDEX_FILENAME
+        self.db_path = Path(db_path)
+        self._conn: Optional[sqlite3.Connection] = None
+        # 同一個連線會在不同 thread 使用（asyncio.to_thread），以鎖保護
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        """第一次用到時才開啟資料庫"""
+        if self._conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(
+                str(self.db_path), timeout=5, check_same_thread=False, isolation_level=None
+            )
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(_SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def upsert(self, run_id: str, task: dict, outputs: dict, mtime: int):
+        """寫入或更新一筆執行記錄"""
+        row = (
+            run_id,
+            task.get("goal", "Unknown"),
+            task.get("status", "unknown"),
+            task.get("created_at", ""),
+            json.dumps(outputs, ensure_ascii=False, separators=(",", ":")),
+            len(task.get("steps", [])),
+            mtime,
+        )
+        with self._lock:
+            self._connect().execute(_UPSERT, row)
+
+    def update_from_dir(self, run_dir: Path, task: dict):
+        """依執行目錄目前的狀態更新索引（task.json 剛寫完時呼叫）"""
+        mtime = os.stat(run_dir / "task.json").st_mtime_ns
+        self.upsert(run_dir.name, task, collect_outputs(run_dir), mtime)
+
+    def recent(self, limit: int = 20) -> list:
+        """最近的執行記錄（依 run_id 由新到舊），一次查詢取回整頁資料"""
+        with self._lock:
+            conn = self._connect()
+            while True:
+                rows = conn.execute(
+                    "SELECT id, goal, status, created_at, outputs_json, steps_count "
+                    "FROM runs ORDER BY id DESC LIMIT ?",
+                    (limit,)
+                ).fetchall()
+                # 執行目錄已被刪除的 run 從索引移除，再補查一次湊滿這一頁
+                missing = [(row[0],) for row in rows if not os.path.isdir(self.runs_dir / row[0])]
+                if not missing:
+                    break
+                conn.executemany("DELETE FROM runs WHERE id = ?", missing)
+        return [
+            {
+                "id": run_id,
+                "goal": goal,
+                "status": status,
+                "created_at": created_at,
+                "outputs": json.loads(outputs_json),
+                "steps_count": steps_count
+            }
+            for run_id, goal, status, created_at, outputs_json, steps_count in rows
+        ]
+
+    def reindex(self) -> int:
+        """
+        掃描 runs/ 補齊索引：新增或 task.json 有變動的 run 才重新讀取，已刪除的 run 移除
+
+        Returns:
+            重新寫入的筆數
+        """
+        with self._lock:
+            known = dict(self._connect().execute("SELECT id, mtime FROM runs").fetchall())
+
+        updated = 0
+        seen = set()
+        try:
+            with os.scandir(self.runs_dir) as it:
+                entries = [e for e in it if e.is_dir()]
+        except FileNotFoundError:
+            entries = []
+
+        for entry in entries:
+            run_dir = Path(entry.path)
+            try:
+                mtime = os.stat(run_dir / "task.json").st_mtime_ns
+            except FileNotFoundError:
+                continue
+            seen.add(entry.name)
+            if known.get(entry.name) == mtime:
+                continue
+            try:
+                task = json.loads((run_dir / "task.json").read_bytes())
+                self.upsert(entry.name, task, collect_outputs(run_dir), mtime)
+                updated += 1
+            except (OSError, ValueError):
+                continue
+
+        stale = [(run_id,) for run_id in known if run_id not in seen]
+        if stale:
+            with self._lock:
+                self._connect().executemany("DELETE FROM runs WHERE id = ?", stale)
+        return updated
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_SHARED_INDEXES: dict = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def get_run_index(runs_dir) -> RunIndex:
+    """同一個 runs 目錄共用一個 RunIndex（一條 sqlite 連線）"""
+    key = os.path.abspath(runs_dir)
+    with _SHARED_LOCK:
+        index = _SHARED_INDEXES.get(key)
+        if index is None:
+            index = _SHARED_INDEXES[key] = RunIndex(runs_dir)
+    return index
@@ -82,7 +82,10 @@ async def run_task(goal: str, model: str = "deepseek-chat",
         ui=ui  # 傳入 UI
     )
 
-    result = await agent.run(goal, output_format=output_format, theme=theme)
+    try:
+        result = await agent.run(goal, output_format=output_format, theme=theme)
+    finally:
+        memory.index.close()
 
     # 顯示結果
     if USE_RICH:
@@ -130,7 +133,7 @@ def list_runs():
             print("No runs found.")
         return
 
-    runs = sorted(runs_dir.iterdir(), reverse=True)
+    runs = sorted((p for p in runs_dir.iterdir() if p.is_dir()), reverse=True)
     if not runs:
         if USE_RICH:
             info("No runs found.")
@@ -1,5 +1,20 @@
-from .browser import BrowserTool
-from .fs import FileTool
-from .code import CodeTool
+from importlib import import_module
 
-__all__ = ["BrowserTool", "FileTool", "CodeTool"]
+# 名稱 -> 所在模組；browser 會載入 playwright，用到時才 import
+_EXPORTS = {
+    "BrowserTool": ".browser",
+    "BrowserPool": ".browser",
+    "FileTool": ".fs",
+    "CodeTool": ".code",
+}
+
+__all__ = ["BrowserTool", "BrowserPool", "FileTool", "CodeTool"]
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -3,7 +3,12 @@ Browser Tool - Playwright 封裝
 LLM 只能說要用哪個工具+參數，這裡負責處理 timeout、retry、反爬、DOM 問題
 """
 import asyncio
+import hashlib
+import os
 import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Optional
 from playwright.async_api import async_playwright, Browser, Page, BrowserContext
 from readability import Document
@@ -21,31 +26,404 @@ except ImportError:
     except ImportError:
         HAS_DDGS = False
 
+# selectolax (C 解析器) 用於去除 HTML 標籤
+try:
+    from selectolax.parser import HTMLParser
+    HAS_SELECTOLAX = True
+except ImportError:
+    HAS_SELECTOLAX = False
+
+# 沒有 selectolax 時的備用標籤清除
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+# 每個 Chromium 使用 N 次後重啟，避免長時間執行的記憶體膨脹
+BROWSER_POOL_RECYCLE_AFTER = int(os.environ.get("BROWSER_POOL_RECYCLE_AFTER", "100"))
+
+_LAUNCH_ARGS = [
+    '--disable-blink-features=AutomationControlled',
+    '--no-sandbox',
+    '--disable-dev-shm-usage'
+]
+
+_CONTEXT_OPTIONS = {
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "viewport": {'width': 1920, 'height': 1080},
+    "locale": 'en-US'
+}
+
+
+class BrowserPool:
+    """
+    預熱的 Chromium 池
+    啟動時一次開好 K 個瀏覽器，acquire() 從負載最輕的瀏覽器開一個新的 BrowserContext，
+    多個 BrowserTool 共用同一個 Chromium（context 彼此隔離），任務數超過 K 也不必排隊
+    """
+
+    def __init__(self, recycle_after: int = BROWSER_POOL_RECYCLE_AFTER):
+        self.recycle_after = recycle_after
+        self.size = 0
+        self._playwright = None
+        self._browsers: list = []   # 可以再開新 context 的瀏覽器
+        self._uses: dict = {}       # browser -> 已開過的 context 數
+        self._active: dict = {}     # browser -> 目前開著的 context 數（含等待重啟的瀏覽器）
+        self._owners: dict = {}     # context -> browser
+        self._recycled = 0
+        self._start_lock = asyncio.Lock()
+        self._launch_lock = asyncio.Lock()
+
+    async def _launch(self) -> Browser:
+        browser = await self._playwright.chromium.launch(headless=True, args=_LAUNCH_ARGS)
+        self._uses[browser] = 0
+        self._active[browser] = 0
+        return browser
+
+    async def _top_up(self):
+        """補足到 size 個瀏覽器；啟動失敗時只要還有可用的瀏覽器就先縮小池，下次再補"""
+        async with self._launch_lock:
+            while len(self._active) < self.size or not self._browsers:
+                try:
+                    self._browsers.append(await self._launch())
+                except Exception as e:
+                    if not self._browsers:
+                        raise
+                    print(f"[BrowserPool] launch failed: {e}")
+                    break
+
+    async def start(self, size: int = 4):
+        """啟動 Playwright 並預先開好 size 個瀏覽器"""
+        async with self._start_lock:
+            if self._playwright is not None:
+                return
+            self._playwright = await async_playwright().start()
+            self.size = size
+            launched = await asyncio.gather(
+                *(self._launch() for _ in range(size)), return_exceptions=True
+            )
+            self._browsers = [b for b in launched if not isinstance(b, BaseException)]
+            await self._top_up()
+
+    async def acquire(self) -> BrowserContext:
+        """從負載最輕的瀏覽器開一個新的 BrowserContext"""
+        if self._playwright is None:
+            await self.start()
+        # 已斷線的瀏覽器不再分配；沒人在用的直接換掉
+        for browser in [b for b in self._browsers if not b.is_connected()]:
+            self._browsers.remove(browser)
+            if self._active[browser] == 0:
+                await self._recycle(browser)
+        if len(self._active) < self.size or not self._browsers:
+            await self._top_up()
+
+        browser = min(self._browsers, key=self._active.__getitem__)
+        self._uses[browser] += 1
+        self._active[browser] += 1
+        if self._uses[browser] >= self.recycle_after:
+            # 用滿次數：不再分配新 context，等手上的 context 都歸還後重啟
+            self._browsers.remove(browser)
+        try:
+            context = await browser.new_context(**_CONTEXT_OPTIONS)
+        except Exception:
+            if browser in self._browsers:
+                self._browsers.remove(browser)
+            await self._done(browser)
+            raise
+        self._owners[context] = browser
+        return context
+
+    async def release(self, context: BrowserContext):
+        """歸還 context"""
+        browser = self._owners.pop(context, None)
+        try:
+            await context.close()
+        except Exception:
+            pass
+        if browser is not None:
+            await self._done(browser)
+
+    async def _done(self, browser: Browser):
+        """一個 context 結束；已退役或斷線的瀏覽器在最後一個 context 結束時重啟"""
+        if browser not in self._active:
+            return
+        self._active[browser] -= 1
+        if browser in self._browsers:
+            if browser.is_connected():
+                return
+            self._browsers.remove(browser)
+        if self._active[browser] == 0:
+            await self._recycle(browser)
+
+    async def _recycle(self, browser: Browser):
+        """關閉舊瀏覽器並補上新的一個"""
+        self._uses.pop(browser, None)
+        self._active.pop(browser, None)
+        try:
+            await browser.close()
+        except Exception:
+            pass
+        self._recycled += 1
+        try:
+            await self._top_up()
+        except Exception as e:
+            # 一個瀏覽器都沒有了：下次 acquire 會再試著啟動
+            print(f"[BrowserPool] relaunch failed: {e}")
+
+    def stats(self) -> dict:
+        """池狀態（供 /metrics 類端點使用）"""
+        return {
+            "size": self.size,
+            "browsers": len(self._active),
+            "in_use": len(self._owners),
+            "contexts": sorted(self._active.values(), reverse=True),
+            "recycled": self._recycled,
+            "recycle_after": self.recycle_after,
+            "uses": sorted(self._uses.values(), reverse=True)
+        }
+
+    async def close(self):
+        """關閉所有瀏覽器"""
+        for context in list(self._owners):
+            try:
+                await context.close()
+            except Exception:
+                pass
+        for browser in list(self._active):
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        if self._playwright:
+            await self._playwright.stop()
+        self._owners.clear()
+        self._uses.clear()
+        self._active.clear()
+        self._browsers = []
+        self._playwright = None
+        self.size = 0
+
+
+# open(fast=True) 等待標題的秒數
+OPEN_TITLE_WAIT = 2.0
+# readability 結果快取上限
+EXTRACT_CACHE_SIZE = 64
+# 從頁面取回的 HTML 上限（字元），避免把 10MB 的頁面整份搬進 Python
+EXTRACT_HTML_LIMIT = 524288
+# extract 回傳內容上限
+EXTRACT_CONTENT_LIMIT = 10000
+
+_OUTER_HTML_JS = "(n) => document.documentElement.outerHTML.slice(0, n)"
+
+_BING_RESULTS_JS = """(n) => Array.from(document.querySelectorAll('li.b_algo')).slice(0, n).map(li => {
+    const a = li.querySelector('h2 a');
+    const p = li.querySelector('p, .b_caption p');
+    return a ? {
+        title: a.innerText.trim(),
+        url: a.getAttribute('href') || '',
+        snippet: (p ? p.innerText : '').trim().slice(0, 200)
+    } : null;
+}).filter(Boolean)"""
+
+
+def _extract_readability(html: str) -> tuple[str, str]:
+    """用 readability 抽出標題與純文字內容"""
+    doc = Document(html)
+    title = doc.title()
+    content = doc.summary()
+    # 清理 HTML 標籤
+    if HAS_SELECTOLAX:
+        content = HTMLParser(content).text(separator=' ')
+    else:
+        content = _TAG_RE.sub('', content)
+    return title, ' '.join(content.split())
+
+
+# readability 是 CPU 密集工作，丟到獨立進程避免卡住 event loop
+EXTRACT_WORKERS = 2
+_EXTRACT_POOL: Optional[ProcessPoolExecutor] = None
+
+
+def _extract_pool() -> ProcessPoolExecutor:
+    global _EXTRACT_POOL
+    if _EXTRACT_POOL is None:
+        _EXTRACT_POOL = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+    return _EXTRACT_POOL
+
+
+async def _extract_readability_async(html: str) -> tuple[str, str]:
+    """在進程池中執行 readability，只有抽出的純文字會傳回來"""
+    global _EXTRACT_POOL
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(_extract_pool(), _extract_readability, html)
+    except BrokenProcessPool:
+        # worker 異常結束：下次重建進程池，這次改用 thread 執行
+        _EXTRACT_POOL = None
+        return await asyncio.to_thread(_extract_readability, html)
+
+
+_DDGS_SINGLETON: Optional["DDGS"] = None
+_DDGS_LOCK = asyncio.Lock()
+
+
+async def _ddgs() -> "DDGS":
+    """共用同一個 DDGS（保留 HTTP 連線與 TLS session）"""
+    global _DDGS_SINGLETON
+    if _DDGS_SINGLETON is None:
+        async with _DDGS_LOCK:
+            if _DDGS_SINGLETON is None:
+                _DDGS_SINGLETON = DDGS()
+    return _DDGS_SINGLETON
+
+
+class SearchProcessor:
+    """
+    搜尋批次處理器（全域共用，見 get_search_processor）
+    只有一筆查詢時立刻送出；已有其他查詢在排隊時才等待 max_wait_ms（或湊滿 batch 筆），
+    一起丟給 DDGS 並行執行
+    """
+
+    def __init__(self, batch: int = 8, max_wait_ms: int = 75):
+        self.batch = batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # 執行中的批次，關閉時一併取消
+        self._running: set = set()
+
+    async def submit(self, query: str, max_results: int = 10) -> list[dict]:
+        """送出查詢並等待結果"""
+        loop = asyncio.get_running_loop()
+        if self._dispatcher is None or self._dispatcher.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        future = loop.create_future()
+        self._queue.put_nowait((query, max_results, future))
+        return await future
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self._queue.get()]
+            # 有其他查詢同時排隊代表正在並行搜尋，才值得等一下湊成一批
+            if not self._queue.empty():
+                deadline = loop.time() + self.max_wait
+                try:
+                    while len(pending) < self.batch:
+                        timeout = deadline - loop.time()
+                        if timeout <= 0:
+                            break
+                        try:
+                            pending.append(await asyncio.wait_for(self._queue.get(), timeout))
+                        except asyncio.TimeoutError:
+                            break
+                except asyncio.CancelledError:
+                    self._cancel_all(pending)
+                    raise
+
+            # 批次在背景執行，慢的查詢不會擋住下一批
+            task = asyncio.create_task(self._run_batch(pending))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    @staticmethod
+    def _cancel_all(pending: list):
+        for _, _, future in pending:
+            future.cancel()
+
+    async def _run_batch(self, pending: list):
+        try:
+            results = await asyncio.gather(
+                *(self._do_one(query, max_results) for query, max_results, _ in pending),
+                return_exceptions=True
+            )
+        except asyncio.CancelledError:
+            self._cancel_all(pending)
+            raise
+        for (_, _, future), result in zip(pending, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def close(self):
+        """停止 dispatcher 與執行中的批次，尚未完成的查詢會被取消"""
+        tasks = list(self._running)
+        if self._dispatcher is not None:
+            tasks.append(self._dispatcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._queue is not None:
+            while not self._queue.empty():
+                self._cancel_all([self._queue.get_nowait()])
+        self._dispatcher = None
+        self._queue = None
+        self._loop = None
+        self._running.clear()
+
+    async def _do_one(self, query: str, max_results: int) -> list[dict]:
+        ddgs = await _ddgs()
+        # DDGS 是同步 API，丟到 thread 才能真正並行
+        search_results = await asyncio.to_thread(
+            lambda: list(ddgs.text(query, max_results=max_results))
+        )
+        return [
+            {
+                "title": r.get("title", ""),
+                "url": r.get("href", ""),
+                "snippet": r.get("body", "")[:200]
+            }
+            for r in search_results
+        ]
+
+
+_DEFAULT_POOL: Optional[BrowserPool] = None
+_SEARCH_PROCESSOR: Optional[SearchProcessor] = None
+
+
+def get_search_processor() -> SearchProcessor:
+    """取得全域共用的 SearchProcessor，同時進行的多個 BrowserTool 才能湊成同一批"""
+    global _SEARCH_PROCESSOR
+    if _SEARCH_PROCESSOR is None:
+        _SEARCH_PROCESSOR = SearchProcessor()
+    return _SEARCH_PROCESSOR
+
+
+def get_browser_pool() -> BrowserPool:
+    """取得全域共用的 BrowserPool（由 web server 在啟動時 start、關閉時 close）"""
+    global _DEFAULT_POOL
+    if _DEFAULT_POOL is None:
+        _DEFAULT_POOL = BrowserPool()
+    return _DEFAULT_POOL
+
 
 class BrowserTool:
-    def __init__(self):
+    def __init__(self, pool: Optional[BrowserPool] = None):
+        self._pool = pool
         self._playwright = None
         self._browser: Optional[Browser] = None
         self._context: Optional[BrowserContext] = None
         self._page: Optional[Page] = None
+        # (url, html 雜湊) -> (title, content)
+        self._extract_cache: OrderedDict = OrderedDict()
 
     async def _ensure_browser(self):
         """確保瀏覽器已啟動"""
-        if self._browser is None:
-            self._playwright = await async_playwright().start()
-            self._browser = await self._playwright.chromium.launch(
-                headless=True,
-                args=[
-                    '--disable-blink-features=AutomationControlled',
-                    '--no-sandbox',
-                    '--disable-dev-shm-usage'
-                ]
-            )
-            self._context = await self._browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-                viewport={'width': 1920, 'height': 1080},
-                locale='en-US'
-            )
+        if self._page is None:
+            if self._pool is not None:
+                # 從預熱池取得 context，不必冷啟動
+                self._context = await self._pool.acquire()
+            else:
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(
+                    headless=True,
+                    args=_LAUNCH_ARGS
+                )
+                self._context = await self._browser.new_context(**_CONTEXT_OPTIONS)
             self._page = await self._context.new_page()
             # 隱藏自動化特徵
             await self._page.add_init_script("""
@@ -60,15 +438,7 @@ class BrowserTool:
         # 優先使用 DuckDuckGo Search API
         if HAS_DDGS:
             try:
-                results = []
-                with DDGS() as ddgs:
-                    search_results = list(ddgs.text(query, max_results=max_results))
-                    for r in search_results:
-                        results.append({
-                            "title": r.get("title", ""),
-                            "url": r.get("href", ""),
-                            "snippet": r.get("body", "")[:200]
-                        })
+                results = await get_search_processor().submit(query, max_results)
                 if results:
                     return results
             except Exception as e:
@@ -87,45 +457,29 @@ class BrowserTool:
             await self._page.goto(search_url, timeout=30000, wait_until="domcontentloaded")
             await asyncio.sleep(1 + random.random())
 
-            results = []
-            items = await self._page.query_selector_all("li.b_algo")
-
-            for item in items[:max_results]:
-                try:
-                    title_el = await item.query_selector("h2 a")
-                    snippet_el = await item.query_selector("p, .b_caption p")
-
-                    if title_el:
-                        title = await title_el.inner_text()
-                        url = await title_el.get_attribute("href")
-                        snippet = ""
-                        if snippet_el:
-                            snippet = await snippet_el.inner_text()
-
-                        if url and url.startswith("http"):
-                            results.append({
-                                "title": title.strip(),
-                                "url": url,
-                                "snippet": snippet.strip()[:200]
-                            })
-                except Exception:
-                    continue
-
-            return results
+            # 在頁面內一次解析完，避免每個元素都來回一次 CDP
+            items = await self._page.evaluate(_BING_RESULTS_JS, max_results)
+            return [r for r in items if r["url"] and r["url"].startswith("http")]
 
         except Exception as e:
             return [{"error": str(e)}]
 
-    async def open(self, url: str, timeout: int = 30000) -> dict:
+    async def open(self, url: str, timeout: int = 30000, fast: bool = False) -> dict:
         """
         開啟指定網頁
+        fast=True 時收到回應就返回，標題最多再等 OPEN_TITLE_WAIT 秒
         返回 {success, url, title, error?}
         """
         await self._ensure_browser()
+        self._invalidate_extract_cache(url)
 
         try:
-            response = await self._page.goto(url, timeout=timeout, wait_until="domcontentloaded")
-            title = await self._page.title()
+            if fast:
+                response = await self._page.goto(url, timeout=timeout, wait_until="commit")
+                title = await self._fast_title()
+            else:
+                response = await self._page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+                title = await self._page.title()
 
             return {
                 "success": True,
@@ -140,6 +494,22 @@ class BrowserTool:
                 "error": str(e)
             }
 
+    async def _fast_title(self) -> str:
+        """等 DOM 就緒後讀取標題，逾時則返回空字串"""
+        async def _title():
+            await self._page.wait_for_load_state("domcontentloaded")
+            return await self._page.evaluate("document.title")
+
+        title_task = asyncio.create_task(_title())
+        done, _ = await asyncio.wait([title_task], timeout=OPEN_TITLE_WAIT)
+        if not done:
+            title_task.cancel()
+            return ""
+        try:
+            return title_task.result() or ""
+        except Exception:
+            return ""
+
     async def extract(self, mode: str = "readability") -> dict:
         """
         提取當前頁面內容
@@ -149,26 +519,31 @@ class BrowserTool:
         await self._ensure_browser()
 
         try:
-            html = await self._page.content()
             url = self._page.url
 
             if mode == "readability":
-                doc = Document(html)
-                title = doc.title()
-                content = doc.summary()
-                # 清理 HTML 標籤
-                content = re.sub(r'<[^>]+>', '', content)
-                content = re.sub(r'\s+', ' ', content).strip()
+                html = await self._page.evaluate(_OUTER_HTML_JS, EXTRACT_HTML_LIMIT)
+                key = (url, hashlib.blake2b(html.encode("utf-8"), digest_size=16).digest())
+                cached = self._extract_cache.get(key)
+                if cached is not None:
+                    self._extract_cache.move_to_end(key)
+                    title, content = cached
+                else:
+                    title, content = await _extract_readability_async(html)
+                    self._extract_cache[key] = (title, content)
+                    if len(self._extract_cache) > EXTRACT_CACHE_SIZE:
+                        self._extract_cache.popitem(last=False)
             elif mode == "text":
                 title = await self._page.title()
                 content = await self._page.inner_text("body")
             else:  # full
                 title = await self._page.title()
-                content = html
+                # 只取回會被回傳的部分
+                content = await self._page.evaluate(_OUTER_HTML_JS, EXTRACT_CONTENT_LIMIT)
 
             return {
                 "title": title,
-                "content": content[:10000],
+                "content": content[:EXTRACT_CONTENT_LIMIT],
                 "url": url
             }
         except Exception as e:
@@ -177,6 +552,11 @@ class BrowserTool:
                 "url": self._page.url if self._page else None
             }
 
+    def _invalidate_extract_cache(self, url: str):
+        """清除指定 URL 的 readability 快取"""
+        for key in [k for k in self._extract_cache if k[0] == url]:
+            del self._extract_cache[key]
+
     async def screenshot(self, path: str) -> dict:
         """
         截圖當前頁面
@@ -199,6 +579,8 @@ class BrowserTool:
 
     async def close(self):
         """關閉瀏覽器"""
+        if self._pool is not None and self._context is not None:
+            await self._pool.release(self._context)
         if self._browser:
             await self._browser.close()
         if self._playwright:
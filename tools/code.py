@@ -2,29 +2,94 @@
 Code Tool - Shell/Python/Git 執行封裝
 負責整理、轉換、後處理
 """
+import asyncio
+import os
+import shlex
+import shutil
 import subprocess
 import sys
+import threading
+import weakref
 from typing import Optional
 
 
+# 同時執行的子進程上限，避免 fork storm（EAGAIN）
+MAX_CONCURRENT_PROCS = int(os.environ.get("MONUS_MAX_PROCS", "8"))
+# async 呼叫端（SandboxTool 等）使用；asyncio.Semaphore 會綁定第一個使用它的 event loop，
+# 所以每個 loop 各建一個（CLI 連續多次 asyncio.run 時才不會出錯）
+_PROC_SEMS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _proc_sem() -> asyncio.Semaphore:
+    """取得目前 event loop 的子進程 semaphore"""
+    loop = asyncio.get_running_loop()
+    sem = _PROC_SEMS.get(loop)
+    if sem is None:
+        sem = _PROC_SEMS[loop] = asyncio.Semaphore(MAX_CONCURRENT_PROCS)
+    return sem
+
+# 同步 / 多執行緒呼叫端使用
+_PROC_THREAD_SEM = threading.BoundedSemaphore(MAX_CONCURRENT_PROCS)
+
+# 出現這些字元就交給 shell 處理（管線、重導向、變數、萬用字元等）
+_SHELL_METACHARS = frozenset("|&;<>()$`*?[]{}~!#\n")
+
+
+def _split_command(cmd: str) -> Optional[list[str]]:
+    """
+    嘗試把命令拆成 argv 直接執行（省掉 /bin/sh）
+    需要 shell 語法、是 shell 內建指令或在 Windows 上時返回 None
+    """
+    if os.name == "nt" or any(c in _SHELL_METACHARS for c in cmd):
+        return None
+    try:
+        args = shlex.split(cmd)
+    except ValueError:
+        return None
+    if not args:
+        return None
+    # cd / export / VAR=value 等只能由 shell 處理
+    if "/" not in args[0] and shutil.which(args[0]) is None:
+        return None
+    return args
+
+
 class CodeTool:
     def __init__(self, timeout: int = 60):
         self.timeout = timeout
 
-    def run(self, cmd: str, cwd: str = ".") -> dict:
+    def run(self, cmd: str, cwd: str = ".", shell: Optional[bool] = None) -> dict:
         """
         執行 shell 命令
+        shell=None 時自動判斷：簡單命令直接執行，需要 shell 語法才經過 /bin/sh
+        shell=True 一律經過 shell；shell=False 一律拆成 argv 直接執行，含 shell 語法時返回錯誤
         返回 {success, stdout, stderr, returncode, error?}
         """
+        if shell:
+            args = None
+        elif shell is None:
+            args = _split_command(cmd)
+        else:
+            try:
+                args = shlex.split(cmd, posix=os.name != "nt")
+            except ValueError as e:
+                return {"success": False, "error": f"Cannot parse command: {e}", "returncode": -1}
+            if not args or any(c in _SHELL_METACHARS for c in cmd):
+                return {
+                    "success": False,
+                    "error": "Command needs shell syntax but shell=False",
+                    "returncode": -1
+                }
         try:
-            result = subprocess.run(
-                cmd,
-                shell=True,
-                cwd=cwd,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
+            with _PROC_THREAD_SEM:
+                result = subprocess.run(
+                    args if args is not None else cmd,
+                    shell=args is None,
+                    cwd=cwd,
+                    capture_output=True,
+                    text=True,
+                    timeout=self.timeout
+                )
 
             return {
                 "success": result.returncode == 0,
@@ -51,13 +116,14 @@ class CodeTool:
         返回 {success, stdout, stderr, error?}
         """
         try:
-            result = subprocess.run(
-                [sys.executable, "-c", code],
-                cwd=cwd,
-                capture_output=True,
-                text=True,
-                timeout=self.timeout
-            )
+            with _PROC_THREAD_SEM:
+                result = subprocess.run(
+                    [sys.executable, "-c", code],
+                    cwd=cwd,
+                    capture_output=True,
+                    text=True,
+                    timeout=self.timeout
+                )
 
             return {
                 "success": result.returncode == 0,
@@ -76,6 +142,44 @@ class CodeTool:
                 "error": str(e)
             }
 
+    async def arun_python(self, code: str, cwd: str = ".") -> dict:
+        """
+        非同步執行 Python 程式碼（不阻塞 event loop）
+        返回 {success, stdout, stderr, error?}
+        """
+        try:
+            async with _proc_sem():
+                process = await asyncio.create_subprocess_exec(
+                    sys.executable, "-c", code,
+                    cwd=cwd,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE
+                )
+                try:
+                    stdout, stderr = await asyncio.wait_for(
+                        process.communicate(),
+                        timeout=self.timeout
+                    )
+                except asyncio.TimeoutError:
+                    process.kill()
+                    await process.wait()
+                    return {
+                        "success": False,
+                        "error": f"Python execution timed out after {self.timeout} seconds"
+                    }
+
+            return {
+                "success": process.returncode == 0,
+                "stdout": stdout.decode("utf-8", errors="replace"),
+                "stderr": stderr.decode("utf-8", errors="replace"),
+                "returncode": process.returncode
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }
+
     def git(self, args: str, cwd: str = ".") -> dict:
         """
         執行 git 命令
@@ -2,11 +2,33 @@
 File System Tool - 檔案操作封裝
 負責所有產物落地
 """
+import asyncio
 import os
 import json
 from pathlib import Path
 from typing import Any, Optional
 
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+# O_BINARY 只存在於 Windows，避免 \n 被轉成 \r\n
+_WRITE_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+
+def write_bytes_fast(path, data: bytes):
+    """以單次 os.open/os.write 寫入檔案，省去 TextIOWrapper 的開銷"""
+    fd = os.open(path, _WRITE_FLAGS, 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
 
 class FileTool:
     def __init__(self, base_dir: str = "."):
@@ -17,10 +39,24 @@ class FileTool:
         寫入檔案
         返回 {success, path, error?}
         """
+        try:
+            return self.write_bytes(path, content.encode("utf-8"))
+        except Exception as e:
+            return {
+                "success": False,
+                "path": path,
+                "error": str(e)
+            }
+
+    def write_bytes(self, path: str, data: bytes) -> dict:
+        """
+        寫入已編碼的檔案內容
+        返回 {success, path, error?}
+        """
         try:
             full_path = self.base_dir / path
             full_path.parent.mkdir(parents=True, exist_ok=True)
-            full_path.write_text(content, encoding="utf-8")
+            write_bytes_fast(full_path, data)
             return {
                 "success": True,
                 "path": str(full_path)
@@ -62,6 +98,10 @@ class FileTool:
         返回 {success, path, error?}
         """
         try:
+            if HAS_ORJSON:
+                # orjson 直接輸出 UTF-8 bytes，不必再編碼一次
+                content = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+                return self.write_bytes(path, content)
             content = json.dumps(data, ensure_ascii=False, indent=2)
             return self.write(path, content)
         except Exception as e:
@@ -77,14 +117,28 @@ class FileTool:
         返回 {success, data, error?}
         """
         try:
-            result = self.read(path)
-            if not result["success"]:
-                return result
-            data = json.loads(result["content"])
+            if HAS_ORJSON:
+                full_path = self.base_dir / path
+                try:
+                    raw = full_path.read_bytes()
+                except Exception as e:
+                    return {
+                        "success": False,
+                        "path": path,
+                        "error": str(e)
+                    }
+                data = orjson.loads(raw)
+                full_path = str(full_path)
+            else:
+                result = self.read(path)
+                if not result["success"]:
+                    return result
+                data = json.loads(result["content"])
+                full_path = result["path"]
             return {
                 "success": True,
                 "data": data,
-                "path": result["path"]
+                "path": full_path
             }
         except json.JSONDecodeError as e:
             return {
@@ -144,3 +198,29 @@ class FileTool:
                 "path": path,
                 "error": str(e)
             }
+
+    # ===== 非同步版本（在 thread 中執行，不阻塞 event loop） =====
+
+    async def awrite(self, path: str, content: str) -> dict:
+        """非同步版 write"""
+        return await asyncio.to_thread(self.write, path, content)
+
+    async def aread(self, path: str) -> dict:
+        """非同步版 read"""
+        return await asyncio.to_thread(self.read, path)
+
+    async def aappend(self, path: str, content: str) -> dict:
+        """非同步版 append"""
+        return await asyncio.to_thread(self.append, path, content)
+
+    async def awrite_json(self, path: str, data: Any) -> dict:
+        """非同步版 write_json"""
+        return await asyncio.to_thread(self.write_json, path, data)
+
+    async def aread_json(self, path: str) -> dict:
+        """非同步版 read_json"""
+        return await asyncio.to_thread(self.read_json, path)
+
+    async def alist_dir(self, path: str = ".") -> dict:
+        """非同步版 list_dir"""
+        return await asyncio.to_thread(self.list_dir, path)
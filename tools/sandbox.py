@@ -7,103 +7,141 @@ import subprocess
 import os
 import json
 import shutil
+import signal
+import uuid
+from itertools import islice
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
+from .code import _proc_sem
+from .fs import write_bytes_fast
 
-class SandboxTool:
-    """
-    沙箱執行環境
-    MVP 版本：使用本地子進程 + 工作目錄隔離
-    進階版本：可切換為 Docker 容器
-    """
 
-    def __init__(self, workspace_dir: str = None, use_docker: bool = False):
-        self.use_docker = use_docker
-        self.container_id = None
-
-        # 設定工作目錄
-        if workspace_dir:
-            self.workspace = Path(workspace_dir)
-        else:
-            self.workspace = Path(__file__).parent.parent / "sandbox_workspace"
+# 列出檔案的上限（避免 dist/.vite 快取等巨大目錄拖慢回應）
+MAX_LIST_ENTRIES = 5000
+MAX_LIST_DEPTH = 8
 
-        self.workspace.mkdir(parents=True, exist_ok=True)
 
-    async def init_project(self, project_name: str, template: str = "vite-react") -> dict:
-        """
-        初始化專案
+class ShellSession:
+    """
+    常駐的 bash 子進程
+    每個命令透過 stdin 送入，用唯一的結束標記切分 stdout/stderr，
+    省掉每次 run_command 都要 fork + exec 一個新 shell 的成本
+    """
 
-        Args:
-            project_name: 專案名稱
-            template: 專案模板 (vite-react, vite-vanilla, python, node)
+    # 單一命令輸出上限（StreamReader buffer）
+    READ_LIMIT = 16 * 1024 * 1024
+
+    def __init__(self):
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def available() -> bool:
+        """系統是否有 bash 可用"""
+        return shutil.which("bash") is not None
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self, project_path: Path):
+        """在專案目錄啟動 bash"""
+        self.process = await asyncio.create_subprocess_exec(
+            "bash", "--noprofile", "--norc",
+            cwd=str(project_path),
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=self.READ_LIMIT,
+            # 自成一個 process group：逾時時連同正在執行的子 shell 與其子進程一起結束
+            start_new_session=True
+        )
 
-        Returns:
-            {success, path, files}
+    async def run(self, cmd: str, timeout: int) -> tuple[int, bytes, bytes]:
         """
-        project_path = self.workspace / project_name
+        執行命令
+        返回 (returncode, stdout, stderr)；逾時會拋出 asyncio.TimeoutError 並關閉 session
+        """
+        async with self._lock:
+            marker = f"__MONUS_END_{uuid.uuid4().hex}__"
+            # 用子 shell 執行，避免 cd/exit 影響 session；stdin 不能接到 session 的 pipe
+            script = (
+                f"( {cmd}\n) < /dev/null\n"
+                f"printf '%s%d\\n' '{marker}' $?\n"
+                f"printf '%s\\n' '{marker}' >&2\n"
+            )
+            self.process.stdin.write(script.encode("utf-8"))
+            await self.process.stdin.drain()
 
-        # 清理舊專案
-        if project_path.exists():
-            shutil.rmtree(project_path)
+            try:
+                (stdout, rc_line), (stderr, _) = await asyncio.wait_for(
+                    asyncio.gather(
+                        self._read_until(self.process.stdout, marker.encode()),
+                        self._read_until(self.process.stderr, marker.encode())
+                    ),
+                    timeout=timeout
+                )
+            except BaseException:
+                await self.close()
+                raise
 
-        project_path.mkdir(parents=True)
+            return int(rc_line), stdout, stderr
 
-        if template == "vite-react":
-            return await self._init_vite_react(project_path)
-        elif template == "vite-vanilla":
-            return await self._init_vite_vanilla(project_path)
-        elif template == "python":
-            return await self._init_python(project_path)
-        elif template == "node":
-            return await self._init_node(project_path)
-        elif template == "html":
-            return await self._init_html(project_path)
-        else:
-            return {"success": False, "error": f"Unknown template: {template}"}
-
-    async def _init_vite_react(self, project_path: Path) -> dict:
-        """初始化 Vite + React 專案"""
-        # 建立基本結構
-        (project_path / "src").mkdir()
-        (project_path / "public").mkdir()
-
-        # package.json
-        package_json = {
-            "name": project_path.name,
-            "private": True,
-            "version": "0.0.0",
-            "type": "module",
-            "scripts": {
-                "dev": "vite",
-                "build": "vite build",
-                "preview": "vite preview"
-            },
-            "dependencies": {
-                "react": "^18.2.0",
-                "react-dom": "^18.2.0"
-            },
-            "devDependencies": {
-                "@vitejs/plugin-react": "^4.2.0",
-                "vite": "^5.0.0"
-            }
-        }
-        (project_path / "package.json").write_text(
-            json.dumps(package_json, indent=2), encoding="utf-8"
-        )
+    @staticmethod
+    async def _read_until(stream: asyncio.StreamReader, marker: bytes) -> tuple[bytes, bytes]:
+        data = await stream.readuntil(marker)
+        rest = await stream.readline()
+        return data[:-len(marker)], rest.strip()
 
-        # vite.config.js
-        vite_config = """import { defineConfig } from 'vite'
+    async def close(self):
+        """結束 bash"""
+        if self.alive:
+            try:
+                if hasattr(os, "killpg"):
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                else:
+                    self.process.kill()
+                await self.process.wait()
+            except ProcessLookupError:
+                pass
+        self.process = None
+
+
+# ==================== 專案模板 ====================
+# 模板在 import 時就編碼成 bytes；package.json 的 "name" 以 __NAME__ 佔位，建立時再替換
+
+_NAME_PLACEHOLDER = b'"__NAME__"'
+
+_VITE_REACT_PACKAGE_JSON = json.dumps({
+    "name": "__NAME__",
+    "private": True,
+    "version": "0.0.0",
+    "type": "module",
+    "scripts": {
+        "dev": "vite",
+        "build": "vite build",
+        "preview": "vite preview"
+    },
+    "dependencies": {
+        "react": "^18.2.0",
+        "react-dom": "^18.2.0"
+    },
+    "devDependencies": {
+        "@vitejs/plugin-react": "^4.2.0",
+        "vite": "^5.0.0"
+    }
+}, indent=2).encode("utf-8")
+
+_VITE_CONFIG_JS = """import { defineConfig } from 'vite'
 import react from '@vitejs/plugin-react'
 
 export default defineConfig({
   plugins: [react()],
 })
-"""
-        (project_path / "vite.config.js").write_text(vite_config, encoding="utf-8")
+""".encode("utf-8")
 
-        # index.html
-        index_html = """<!DOCTYPE html>
+_VITE_REACT_INDEX_HTML = """<!DOCTYPE html>
 <html lang="en">
   <head>
     <meta charset="UTF-8" />
@@ -115,11 +153,9 @@ export default defineConfig({
     <script type="module" src="/src/main.jsx"></script>
   </body>
 </html>
-"""
-        (project_path / "index.html").write_text(index_html, encoding="utf-8")
+""".encode("utf-8")
 
-        # src/main.jsx
-        main_jsx = """import React from 'react'
+_VITE_REACT_MAIN_JSX = """import React from 'react'
 import ReactDOM from 'react-dom/client'
 import App from './App.jsx'
 import './index.css'
@@ -129,11 +165,9 @@ ReactDOM.createRoot(document.getElementById('root')).render(
     <App />
   </React.StrictMode>,
 )
-"""
-        (project_path / "src" / "main.jsx").write_text(main_jsx, encoding="utf-8")
+""".encode("utf-8")
 
-        # src/App.jsx
-        app_jsx = """import { useState } from 'react'
+_VITE_REACT_APP_JSX = """import { useState } from 'react'
 
 function App() {
   const [count, setCount] = useState(0)
@@ -151,11 +185,9 @@ function App() {
 }
 
 export default App
-"""
-        (project_path / "src" / "App.jsx").write_text(app_jsx, encoding="utf-8")
+""".encode("utf-8")
 
-        # src/index.css
-        index_css = """:root {
+_VITE_REACT_INDEX_CSS = """:root {
   font-family: Inter, system-ui, sans-serif;
   background: #242424;
   color: rgba(255, 255, 255, 0.87);
@@ -187,19 +219,19 @@ button {
 button:hover {
   border-color: #646cff;
 }
-"""
-        (project_path / "src" / "index.css").write_text(index_css, encoding="utf-8")
-
-        return {
-            "success": True,
-            "path": str(project_path),
-            "files": self._list_files(project_path)
-        }
+""".encode("utf-8")
+
+_VITE_REACT_DIRS = ("src", "public")
+_VITE_REACT_FILES = (
+    ("package.json", _VITE_REACT_PACKAGE_JSON),
+    ("vite.config.js", _VITE_CONFIG_JS),
+    ("index.html", _VITE_REACT_INDEX_HTML),
+    ("src/main.jsx", _VITE_REACT_MAIN_JSX),
+    ("src/App.jsx", _VITE_REACT_APP_JSX),
+    ("src/index.css", _VITE_REACT_INDEX_CSS),
+)
 
-    async def _init_html(self, project_path: Path) -> dict:
-        """初始化純 HTML 專案"""
-        # index.html
-        index_html = """<!DOCTYPE html>
+_HTML_INDEX_HTML = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -214,11 +246,9 @@ button:hover {
     <script src="script.js"></script>
 </body>
 </html>
-"""
-        (project_path / "index.html").write_text(index_html, encoding="utf-8")
+""".encode("utf-8")
 
-        # style.css
-        style_css = """* {
+_HTML_STYLE_CSS = """* {
     margin: 0;
     padding: 0;
     box-sizing: border-box;
@@ -244,58 +274,43 @@ h1 {
     -webkit-background-clip: text;
     -webkit-text-fill-color: transparent;
 }
-"""
-        (project_path / "style.css").write_text(style_css, encoding="utf-8")
+""".encode("utf-8")
 
-        # script.js
-        script_js = """// Monus Generated App
+_HTML_SCRIPT_JS = """// Monus Generated App
 console.log('Monus App Started!');
 
 document.addEventListener('DOMContentLoaded', () => {
     const app = document.getElementById('app');
     // Your code here
 });
-"""
-        (project_path / "script.js").write_text(script_js, encoding="utf-8")
+""".encode("utf-8")
 
-        return {
-            "success": True,
-            "path": str(project_path),
-            "files": self._list_files(project_path)
-        }
-
-    async def _init_vite_vanilla(self, project_path: Path) -> dict:
-        """初始化 Vite Vanilla 專案"""
-        # 類似 vite-react 但不用 React
-        (project_path / "src").mkdir()
-
-        package_json = {
-            "name": project_path.name,
-            "private": True,
-            "version": "0.0.0",
-            "type": "module",
-            "scripts": {
-                "dev": "vite",
-                "build": "vite build"
-            },
-            "devDependencies": {
-                "vite": "^5.0.0"
-            }
-        }
-        (project_path / "package.json").write_text(
-            json.dumps(package_json, indent=2), encoding="utf-8"
-        )
+_HTML_FILES = (
+    ("index.html", _HTML_INDEX_HTML),
+    ("style.css", _HTML_STYLE_CSS),
+    ("script.js", _HTML_SCRIPT_JS),
+)
 
-        return {
-            "success": True,
-            "path": str(project_path),
-            "files": self._list_files(project_path)
-        }
+_VITE_VANILLA_PACKAGE_JSON = json.dumps({
+    "name": "__NAME__",
+    "private": True,
+    "version": "0.0.0",
+    "type": "module",
+    "scripts": {
+        "dev": "vite",
+        "build": "vite build"
+    },
+    "devDependencies": {
+        "vite": "^5.0.0"
+    }
+}, indent=2).encode("utf-8")
+
+_VITE_VANILLA_DIRS = ("src",)
+_VITE_VANILLA_FILES = (
+    ("package.json", _VITE_VANILLA_PACKAGE_JSON),
+)
 
-    async def _init_python(self, project_path: Path) -> dict:
-        """初始化 Python 專案"""
-        # main.py
-        main_py = '''"""
+_PYTHON_MAIN_PY = '''"""
 Monus Generated Python App
 """
 
@@ -304,36 +319,146 @@ def main():
 
 if __name__ == "__main__":
     main()
-'''
-        (project_path / "main.py").write_text(main_py, encoding="utf-8")
+'''.encode("utf-8")
 
-        # requirements.txt
-        (project_path / "requirements.txt").write_text("", encoding="utf-8")
+_PYTHON_FILES = (
+    ("main.py", _PYTHON_MAIN_PY),
+    ("requirements.txt", b""),
+)
 
-        return {
-            "success": True,
-            "path": str(project_path),
-            "files": self._list_files(project_path)
-        }
+_NODE_PACKAGE_JSON = json.dumps({
+    "name": "__NAME__",
+    "version": "1.0.0",
+    "main": "index.js",
+    "scripts": {
+        "start": "node index.js"
+    }
+}, indent=2).encode("utf-8")
+
+_NODE_INDEX_JS = """// Monus Generated Node.js App
+console.log('Hello from Monus!');
+""".encode("utf-8")
+
+_NODE_FILES = (
+    ("package.json", _NODE_PACKAGE_JSON),
+    ("index.js", _NODE_INDEX_JS),
+)
+
+
+class SandboxTool:
+    """
+    沙箱執行環境
+    MVP 版本：使用本地子進程 + 工作目錄隔離
+    進階版本：可切換為 Docker 容器
+    """
+
+    def __init__(self, workspace_dir: str = None, use_docker: bool = False):
+        self.use_docker = use_docker
+        self.container_id = None
+
+        # 設定工作目錄
+        if workspace_dir:
+            self.workspace = Path(workspace_dir)
+        else:
+            self.workspace = Path(__file__).parent.parent / "sandbox_workspace"
+
+        self.workspace.mkdir(parents=True, exist_ok=True)
+
+        # project_name -> ShellSession
+        self._sessions: dict[str, ShellSession] = {}
+        # 背景刪除中的舊目錄
+        self._reapers: set[asyncio.Task] = set()
+
+    async def init_project(self, project_name: str, template: str = "vite-react") -> dict:
+        """
+        初始化專案
+
+        Args:
+            project_name: 專案名稱
+            template: 專案模板 (vite-react, vite-vanilla, python, node)
+
+        Returns:
+            {success, path, files}
+        """
+        project_path = self.workspace / project_name
+
+        # 清理舊專案
+        await self.close_session(project_name)
+        if project_path.exists():
+            await self._discard_dir(project_path)
+
+        project_path.mkdir(parents=True)
+
+        if template == "vite-react":
+            return await self._init_vite_react(project_path)
+        elif template == "vite-vanilla":
+            return await self._init_vite_vanilla(project_path)
+        elif template == "python":
+            return await self._init_python(project_path)
+        elif template == "node":
+            return await self._init_node(project_path)
+        elif template == "html":
+            return await self._init_html(project_path)
+        else:
+            return {"success": False, "error": f"Unknown template: {template}"}
+
+    async def _discard_dir(self, path: Path):
+        """
+        移除目錄而不阻塞 event loop
+        先改名成隱藏的 trash 目錄（立即返回），再於背景 thread 刪除
+        """
+        trash = path.with_name(f".{path.name}.trash.{uuid.uuid4().hex[:8]}")
+        try:
+            path.rename(trash)
+        except OSError:
+            # 改名失敗（例如 Windows 檔案被鎖）就直接在 thread 中刪除
+            await asyncio.to_thread(shutil.rmtree, path, ignore_errors=True)
+            return
+
+        task = asyncio.create_task(asyncio.to_thread(shutil.rmtree, trash, ignore_errors=True))
+        self._reapers.add(task)
+        task.add_done_callback(self._reapers.discard)
+
+    async def _init_vite_react(self, project_path: Path) -> dict:
+        """初始化 Vite + React 專案"""
+        return self._write_template(project_path, _VITE_REACT_FILES, _VITE_REACT_DIRS)
+
+    async def _init_html(self, project_path: Path) -> dict:
+        """初始化純 HTML 專案"""
+        return self._write_template(project_path, _HTML_FILES)
+
+    async def _init_vite_vanilla(self, project_path: Path) -> dict:
+        """初始化 Vite Vanilla 專案"""
+        # 類似 vite-react 但不用 React
+        return self._write_template(project_path, _VITE_VANILLA_FILES, _VITE_VANILLA_DIRS)
+
+    async def _init_python(self, project_path: Path) -> dict:
+        """初始化 Python 專案"""
+        return self._write_template(project_path, _PYTHON_FILES)
 
     async def _init_node(self, project_path: Path) -> dict:
         """初始化 Node.js 專案"""
-        package_json = {
-            "name": project_path.name,
-            "version": "1.0.0",
-            "main": "index.js",
-            "scripts": {
-                "start": "node index.js"
-            }
-        }
-        (project_path / "package.json").write_text(
-            json.dumps(package_json, indent=2), encoding="utf-8"
-        )
+        return self._write_template(project_path, _NODE_FILES)
 
-        index_js = """// Monus Generated Node.js App
-console.log('Hello from Monus!');
-"""
-        (project_path / "index.js").write_text(index_js, encoding="utf-8")
+    def _write_template(self, project_path: Path, files: tuple, dirs: tuple = ()) -> dict:
+        """
+        把模板常數直接寫進專案目錄
+        只有 package.json 需要填入專案名稱
+        """
+        name = json.dumps(project_path.name).encode("utf-8")
+
+        # 先一次建好所有不重複的目錄，寫檔時就不必逐一 mkdir
+        targets = [(project_path / rel, data) for rel, data in files]
+        parents = {project_path / d for d in dirs}
+        parents.update(target.parent for target, _ in targets)
+        parents.discard(project_path)
+        for d in sorted(parents):
+            d.mkdir(parents=True, exist_ok=True)
+
+        for target, data in targets:
+            if _NAME_PLACEHOLDER in data:
+                data = data.replace(_NAME_PLACEHOLDER, name, 1)
+            write_bytes_fast(target, data)
 
         return {
             "success": True,
@@ -341,25 +466,47 @@ console.log('Hello from Monus!');
             "files": self._list_files(project_path)
         }
 
-    def _list_files(self, path: Path, prefix: str = "") -> list:
-        """列出目錄下所有檔案"""
-        files = []
-        for item in sorted(path.iterdir()):
-            if item.name.startswith('.'):
-                continue
-            if item.name == 'node_modules':
+    @staticmethod
+    def _scan_dir(path) -> list:
+        """讀取目錄（依名稱排序，略過隱藏檔與 node_modules）"""
+        with os.scandir(path) as it:
+            entries = [
+                e for e in it
+                if not e.name.startswith('.') and e.name != 'node_modules'
+            ]
+        entries.sort(key=lambda e: e.name)
+        return entries
+
+    def _iter_files(self, path: Path, max_depth: int = MAX_LIST_DEPTH) -> Iterator[dict]:
+        """逐一產生目錄下的檔案（深度超過 max_depth 的目錄不再展開）"""
+        # 用明確的 stack 取代遞迴；DirEntry 會快取 readdir 的型別資訊
+        stack = [(iter(self._scan_dir(path)), "")]
+        while stack:
+            it, prefix = stack[-1]
+            entry = next(it, None)
+            if entry is None:
+                stack.pop()
                 continue
 
-            rel_path = f"{prefix}{item.name}"
-            if item.is_dir():
-                files.append({"path": rel_path, "type": "dir"})
-                files.extend(self._list_files(item, f"{rel_path}/"))
+            rel_path = f"{prefix}{entry.name}"
+            if entry.is_dir():
+                yield {"path": rel_path, "type": "dir"}
+                # 指向目錄的 symlink 照樣列為 dir，但不展開，避免循環連結
+                if len(stack) < max_depth and not entry.is_symlink():
+                    stack.append((iter(self._scan_dir(entry.path)), f"{rel_path}/"))
             else:
-                files.append({
+                yield {
                     "path": rel_path,
                     "type": "file",
-                    "size": item.stat().st_size
-                })
+                    "size": entry.stat().st_size
+                }
+
+    def _list_files(self, path: Path, max_entries: int = MAX_LIST_ENTRIES,
+                    max_depth: int = MAX_LIST_DEPTH) -> list:
+        """列出目錄下所有檔案，超過 max_entries 時以 {"truncated": True} 結尾"""
+        files = list(islice(self._iter_files(path, max_depth), max_entries + 1))
+        if len(files) > max_entries:
+            files[max_entries:] = [{"truncated": True}]
         return files
 
     async def write_file(self, project_name: str, file_path: str, content: str) -> dict:
@@ -379,7 +526,7 @@ console.log('Hello from Monus!');
         # 確保目錄存在
         full_path.parent.mkdir(parents=True, exist_ok=True)
 
-        full_path.write_text(content, encoding="utf-8")
+        write_bytes_fast(full_path, content.encode("utf-8"))
 
         return {
             "success": True,
@@ -400,11 +547,11 @@ console.log('Hello from Monus!');
         """
         full_path = self.workspace / project_name / file_path
 
-        if not full_path.exists():
+        try:
+            content = await asyncio.to_thread(full_path.read_text, encoding="utf-8")
+        except (FileNotFoundError, IsADirectoryError):
             return {"success": False, "error": "File not found"}
 
-        content = full_path.read_text(encoding="utf-8")
-
         return {
             "success": True,
             "content": content,
@@ -417,22 +564,32 @@ console.log('Hello from Monus!');
 
         if full_path.exists():
             if full_path.is_dir():
-                shutil.rmtree(full_path)
+                await asyncio.to_thread(shutil.rmtree, full_path)
             else:
                 full_path.unlink()
 
         return {"success": True, "path": file_path}
 
-    async def list_files(self, project_name: str) -> dict:
-        """列出專案檔案"""
+    async def list_files(self, project_name: str, offset: int = 0,
+                         limit: int = MAX_LIST_ENTRIES) -> dict:
+        """
+        列出專案檔案（可分頁）
+
+        Returns:
+            {success, files, truncated}；truncated 為 True 時可用 offset + limit 取下一頁
+        """
         project_path = self.workspace / project_name
 
         if not project_path.exists():
             return {"success": False, "error": "Project not found"}
 
+        files = list(islice(self._iter_files(project_path), offset, offset + limit + 1))
+        truncated = len(files) > limit
+
         return {
             "success": True,
-            "files": self._list_files(project_path)
+            "files": files[:limit],
+            "truncated": truncated
         }
 
     async def run_command(self, project_name: str, command: str, timeout: int = 60) -> dict:
@@ -453,34 +610,65 @@ console.log('Hello from Monus!');
             return {"success": False, "error": "Project not found"}
 
         try:
-            # 使用 subprocess 執行
-            process = await asyncio.create_subprocess_shell(
-                command,
-                cwd=str(project_path),
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                shell=True
-            )
-
-            try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=timeout
-                )
-            except asyncio.TimeoutError:
-                process.kill()
-                return {"success": False, "error": "Command timeout"}
+            # 限制同時執行的子進程數量
+            async with _proc_sem():
+                if ShellSession.available():
+                    # 重用專案的常駐 shell
+                    session = await self._get_session(project_name, project_path)
+                    try:
+                        returncode, stdout, stderr = await session.run(command, timeout)
+                    except asyncio.TimeoutError:
+                        return {"success": False, "error": "Command timeout"}
+                else:
+                    # 沒有 bash（例如 Windows）時使用 subprocess 執行
+                    process = await asyncio.create_subprocess_shell(
+                        command,
+                        cwd=str(project_path),
+                        stdout=asyncio.subprocess.PIPE,
+                        stderr=asyncio.subprocess.PIPE,
+                        shell=True
+                    )
+
+                    try:
+                        stdout, stderr = await asyncio.wait_for(
+                            process.communicate(),
+                            timeout=timeout
+                        )
+                    except asyncio.TimeoutError:
+                        process.kill()
+                        return {"success": False, "error": "Command timeout"}
+                    returncode = process.returncode
 
             return {
-                "success": process.returncode == 0,
+                "success": returncode == 0,
                 "stdout": stdout.decode("utf-8", errors="replace"),
                 "stderr": stderr.decode("utf-8", errors="replace"),
-                "returncode": process.returncode
+                "returncode": returncode
             }
 
         except Exception as e:
             return {"success": False, "error": str(e)}
 
+    async def _get_session(self, project_name: str, project_path: Path) -> ShellSession:
+        """取得（必要時啟動）專案的 ShellSession"""
+        session = self._sessions.get(project_name)
+        if session is None or not session.alive:
+            session = ShellSession()
+            await session.start(project_path)
+            self._sessions[project_name] = session
+        return session
+
+    async def close_session(self, project_name: str):
+        """關閉專案的 ShellSession"""
+        session = self._sessions.pop(project_name, None)
+        if session is not None:
+            await session.close()
+
+    async def close(self):
+        """關閉所有 ShellSession"""
+        for project_name in list(self._sessions):
+            await self.close_session(project_name)
+
     async def install_deps(self, project_name: str) -> dict:
         """安裝依賴"""
         project_path = self.workspace / project_name
@@ -2,13 +2,104 @@
 Slides Tool - Markdown 轉 Slidev 風格簡報
 純 HTML/CSS，無需 Node.js
 """
-import markdown
+import asyncio
+import codecs
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
+from typing import Optional
+
+# Markdown 解析器：優先用 C 實作的 cmarkgfm，其次 mistune，最後 python-markdown
+try:
+    import cmarkgfm
+    from cmarkgfm.cmark import Options as _CmarkOptions
+    MARKDOWN_BACKEND = "cmarkgfm"
+    # HARDBREAKS 對應 nl2br；UNSAFE 保留原始 HTML（與 python-markdown 行為一致）
+    _CMARK_OPTIONS = _CmarkOptions.CMARK_OPT_HARDBREAKS | _CmarkOptions.CMARK_OPT_UNSAFE
+    # 不用 github_flavored_markdown_to_html：它會輸出 <pre lang>，highlight.js 需要 language- class
+    _CMARK_EXTENSIONS = ['table', 'strikethrough', 'autolink', 'tasklist']
+except ImportError:
+    try:
+        import mistune
+        MARKDOWN_BACKEND = "mistune"
+        _MISTUNE = mistune.create_markdown(
+            escape=False, hard_wrap=True, plugins=['table', 'strikethrough']
+        )
+    except ImportError:
+        import markdown
+        MARKDOWN_BACKEND = "markdown"
+
+
+def _render_markdown(text: str) -> str:
+    """將單張投影片的 Markdown 轉成 HTML"""
+    if MARKDOWN_BACKEND == "cmarkgfm":
+        return cmarkgfm.markdown_to_html_with_extensions(
+            text, options=_CMARK_OPTIONS, extensions=_CMARK_EXTENSIONS
+        )
+    if MARKDOWN_BACKEND == "mistune":
+        return _MISTUNE(text)
+    return markdown.markdown(text, extensions=['fenced_code', 'tables', 'nl2br'])
+
+
+# 投影片分隔線
+_SEP = '\n---\n'
+_SEP_BYTES = _SEP.encode()
+# 以 ## 標題切分投影片（零寬比對，標題保留在下一張的開頭）
+_H2_RE = re.compile(r'(?m)^(?=## )')
+
+
+def _iter_slides(data, sep=_SEP):
+    """
+    依分隔線逐張產生投影片（去除前後空白、略過空白投影片）
+    data 與 sep 可同為 str 或同為 bytes；用 find 從目前位置往後找，不會重複複製剩餘內容
+    """
+    pos = 0
+    step = len(sep)
+    while True:
+        end = data.find(sep, pos)
+        chunk = (data[pos:end] if end >= 0 else data[pos:]).strip()
+        if chunk:
+            yield chunk
+        if end < 0:
+            return
+        pos = end + step
+
+
+# cmarkgfm 在 C 裡解析時會釋放 GIL，各投影片可在 thread 中並行
+RENDER_WORKERS = min(8, os.cpu_count() or 1)
+_RENDER_POOL: Optional[ThreadPoolExecutor] = None
+
+
+def _render_pool() -> ThreadPoolExecutor:
+    global _RENDER_POOL
+    if _RENDER_POOL is None:
+        _RENDER_POOL = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="slides")
+    return _RENDER_POOL
+
+
+# 已轉換簡報的快取數量（同一份 Markdown 重複預覽時不必重新轉換）
+DECK_CACHE_SIZE = 16
+
+# 單張投影片的外框
+_SLIDE_TEMPLATE = '''
+                <section class="slide" id="slide-%d">
+                    <div class="content">%s</div>
+                </section>
+                '''
 
 
 class SlidesTool:
     def __init__(self):
         self.themes = ["default", "dark", "minimal"]
+        # 內容雜湊 -> 已包好外框的投影片 HTML（LRU）
+        self._cache: OrderedDict = OrderedDict()
+        # generate 在 thread 中執行，快取需加鎖
+        self._cache_lock = threading.Lock()
 
     async def generate(self, markdown_content: str, output_path: str,
                        title: str = "Presentation", theme: str = "default") -> dict:
@@ -34,39 +125,79 @@ class SlidesTool:
         Returns:
             {success: bool, path: str, slides_count: int, error?: str}
         """
-        try:
-            # 分割投影片
-            slides = markdown_content.split('\n---\n')
-            slides = [s.strip() for s in slides if s.strip()]
-
-            if not slides:
-                # 如果沒有 --- 分隔，嘗試按標題分割
-                slides = self._split_by_headers(markdown_content)
-
-            # 轉換每張投影片為 HTML
-            slides_html = []
-            for i, slide_md in enumerate(slides):
-                slide_html = markdown.markdown(
-                    slide_md,
-                    extensions=['fenced_code', 'tables', 'nl2br']
-                )
-                slides_html.append(f'''
-                <section class="slide" id="slide-{i}">
-                    <div class="content">{slide_html}</div>
-                </section>
-                ''')
+        # 轉換與寫檔都是同步工作，丟到 thread 避免卡住 event loop
+        return await asyncio.to_thread(self._generate_impl, markdown_content, output_path, title, theme)
+
+    async def generate_from_path(self, md_path: str, output_path: str,
+                                 title: str = "Presentation", theme: str = "default") -> dict:
+        """
+        從 Markdown 檔案生成簡報
+
+        直接以 bytes 讀檔、雜湊與切分投影片，只解碼切好的各張投影片，
+        不必先把整份檔案解碼成 str 再編碼回 UTF-8
 
-            # 組合完整 HTML
-            full_html = self._build_html(slides_html, title, theme)
+        Args:
+            md_path: Markdown 檔案路徑（UTF-8）
+            其餘參數同 generate
+        """
+        return await asyncio.to_thread(self._generate_from_path_impl, md_path, output_path, title, theme)
+
+    def _generate_impl(self, markdown_content: str, output_path: str,
+                       title: str = "Presentation", theme: str = "default") -> dict:
+        """generate 的同步實作（generate_slides_sync 直接呼叫，不必建立 event loop）"""
+        return self._build(markdown_content.encode('utf-8'), lambda: self._split(markdown_content),
+                           output_path, title, theme)
+
+    def _generate_from_path_impl(self, md_path: str, output_path: str,
+                                 title: str = "Presentation", theme: str = "default") -> dict:
+        """generate_from_path 的同步實作"""
+        try:
+            data = Path(md_path).read_bytes()
+        except OSError as e:
+            return {
+                "success": False,
+                "path": output_path,
+                "error": str(e)
+            }
+        # 與 read_text 一致：去掉 BOM、統一換行
+        if data.startswith(codecs.BOM_UTF8):
+            data = data[len(codecs.BOM_UTF8):]
+        if b'\r' in data:
+            data = data.replace(b'\r\n', b'\n').replace(b'\r', b'\n')
+        return self._build(data, lambda: self._split_bytes(data), output_path, title, theme)
+
+    def _build(self, data: bytes, split, output_path: str, title: str, theme: str) -> dict:
+        """以 UTF-8 內容查快取，沒命中才切分（split()）並轉換，最後寫出檔案"""
+        try:
+            # 標題與主題只影響外層 HTML（_html_prefix 另有快取），所以只用內容當 key
+            key = hashlib.blake2b(data, digest_size=16).digest()
+            with self._cache_lock:
+                slides_html = self._cache.get(key)
+                if slides_html is not None:
+                    self._cache.move_to_end(key)
+            if slides_html is None:
+                slides = split()
+
+                # 轉換每張投影片為 HTML
+                if MARKDOWN_BACKEND == "cmarkgfm" and len(slides) > 1:
+                    rendered = list(_render_pool().map(_render_markdown, slides))
+                else:
+                    rendered = [_render_markdown(slide_md) for slide_md in slides]
+
+                slides_html = [_SLIDE_TEMPLATE % (i, slide_html) for i, slide_html in enumerate(rendered)]
+                with self._cache_lock:
+                    self._cache[key] = slides_html
+                    if len(self._cache) > DECK_CACHE_SIZE:
+                        self._cache.popitem(last=False)
 
             # 寫入檔案
             Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-            Path(output_path).write_text(full_html, encoding='utf-8')
+            self._write_html(output_path, slides_html, title, theme)
 
             return {
                 "success": True,
                 "path": output_path,
-                "slides_count": len(slides)
+                "slides_count": len(slides_html)
             }
 
         except Exception as e:
@@ -76,135 +207,46 @@ class SlidesTool:
                 "error": str(e)
             }
 
-    def _split_by_headers(self, content: str) -> list:
-        """按 ## 標題分割投影片"""
-        lines = content.split('\n')
-        slides = []
-        current_slide = []
-
-        for line in lines:
-            if line.startswith('## ') and current_slide:
-                slides.append('\n'.join(current_slide))
-                current_slide = [line]
-            else:
-                current_slide.append(line)
-
-        if current_slide:
-            slides.append('\n'.join(current_slide))
-
-        return slides if slides else [content]
-
-    def _build_html(self, slides_html: list, title: str, theme: str) -> str:
-        """建構完整的 HTML 簡報"""
-        slides_joined = '\n'.join(slides_html)
-        total = len(slides_html)
+    def _split(self, content: str) -> list:
+        """分割投影片"""
+        if content.find(_SEP) < 0:
+            # 如果沒有 --- 分隔，嘗試按標題分割
+            return self._split_by_headers(content)
+        return list(_iter_slides(content)) or [content]
 
-        return f'''<!DOCTYPE html>
-<html lang="zh-TW">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.9.0/styles/github-dark.min.css">
-    <script src="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.9.0/highlight.min.js"></script>
-    <style>
-        {self._get_theme_css(theme)}
-    </style>
-</head>
-<body>
-    <div class="slides-container">
-        {slides_joined}
-    </div>
+    def _split_bytes(self, data: bytes) -> list:
+        """分割 UTF-8 內容的投影片，只解碼切好的各張"""
+        if data.find(_SEP_BYTES) < 0:
+            return self._split_by_headers(data.decode('utf-8'))
+        return [chunk.decode('utf-8') for chunk in _iter_slides(data, _SEP_BYTES)] or [data.decode('utf-8')]
 
-    <div class="controls">
-        <button onclick="prevSlide()" title="上一張 (←)">◀</button>
-        <span id="progress">1 / {total}</span>
-        <button onclick="nextSlide()" title="下一張 (→)">▶</button>
-        <button onclick="toggleFullscreen()" title="全螢幕 (F)">⛶</button>
-    </div>
-
-    <div class="progress-bar">
-        <div class="progress-fill" id="progressFill"></div>
-    </div>
-
-    <script>
-        let currentSlide = 0;
-        const slides = document.querySelectorAll('.slide');
-        const total = slides.length;
-
-        function showSlide(n) {{
-            slides.forEach((s, i) => {{
-                s.classList.toggle('active', i === n);
-            }});
-            document.getElementById('progress').textContent = `${{n + 1}} / ${{total}}`;
-            document.getElementById('progressFill').style.width = `${{((n + 1) / total) * 100}}%`;
-        }}
-
-        function nextSlide() {{
-            currentSlide = (currentSlide + 1) % total;
-            showSlide(currentSlide);
-        }}
-
-        function prevSlide() {{
-            currentSlide = (currentSlide - 1 + total) % total;
-            showSlide(currentSlide);
-        }}
-
-        function toggleFullscreen() {{
-            if (!document.fullscreenElement) {{
-                document.documentElement.requestFullscreen();
-            }} else {{
-                document.exitFullscreen();
-            }}
-        }}
-
-        // 鍵盤控制
-        document.addEventListener('keydown', (e) => {{
-            if (e.key === 'ArrowRight' || e.key === ' ' || e.key === 'Enter') {{
-                e.preventDefault();
-                nextSlide();
-            }}
-            if (e.key === 'ArrowLeft' || e.key === 'Backspace') {{
-                e.preventDefault();
-                prevSlide();
-            }}
-            if (e.key === 'f' || e.key === 'F') {{
-                toggleFullscreen();
-            }}
-            if (e.key === 'Home') {{
-                currentSlide = 0;
-                showSlide(0);
-            }}
-            if (e.key === 'End') {{
-                currentSlide = total - 1;
-                showSlide(currentSlide);
-            }}
-        }});
-
-        // 觸控支援
-        let touchStartX = 0;
-        document.addEventListener('touchstart', (e) => {{
-            touchStartX = e.touches[0].clientX;
-        }});
-        document.addEventListener('touchend', (e) => {{
-            const diff = touchStartX - e.changedTouches[0].clientX;
-            if (Math.abs(diff) > 50) {{
-                if (diff > 0) nextSlide();
-                else prevSlide();
-            }}
-        }});
-
-        // 初始化
-        showSlide(0);
-        hljs.highlightAll();
-    </script>
-</body>
-</html>'''
-
-    def _get_theme_css(self, theme: str) -> str:
-        """取得主題 CSS"""
-        themes = {
-            "default": """
+    def _split_by_headers(self, content: str) -> list:
+        """按 ## 標題分割投影片（只收集標題的位置，再依位置切片）"""
+        starts = [m.start() for m in _H2_RE.finditer(content)]
+        if not starts or starts[0]:
+            starts.insert(0, 0)
+        starts.append(len(content))
+        slides = [
+            slide for slide in (content[a:b].strip() for a, b in zip(starts, starts[1:]))
+            if slide
+        ]
+        return slides or [content]
+
+    def _write_html(self, output_path: str, slides_html: list, title: str, theme: str):
+        """直接串流寫出完整的 HTML 簡報，不先組成整份字串"""
+        with open(output_path, 'wb', buffering=1 << 20) as f:
+            f.write(_html_prefix(title, theme))
+            for i, section in enumerate(slides_html):
+                if i:
+                    f.write(b'\n')
+                f.write(section.encode('utf-8'))
+            f.write(_html_suffix(len(slides_html)))
+
+
+def _theme_css_source(theme: str) -> str:
+    """主題 CSS 原始碼（保留排版方便維護，輸出前會先壓縮）"""
+    themes = {
+        "default": """
                 :root {
                     --bg: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%);
                     --text: #eaeaea;
@@ -213,7 +255,7 @@ class SlidesTool:
                     --control-bg: rgba(0, 0, 0, 0.6);
                 }
             """,
-            "dark": """
+        "dark": """
                 :root {
                     --bg: linear-gradient(135deg, #0d1117 0%, #161b22 100%);
                     --text: #c9d1d9;
@@ -222,7 +264,7 @@ class SlidesTool:
                     --control-bg: rgba(22, 27, 34, 0.9);
                 }
             """,
-            "minimal": """
+        "minimal": """
                 :root {
                     --bg: linear-gradient(135deg, #ffffff 0%, #f5f5f5 100%);
                     --text: #1a1a1a;
@@ -231,11 +273,11 @@ class SlidesTool:
                     --control-bg: rgba(255, 255, 255, 0.9);
                 }
             """
-        }
+    }
 
-        base_css = themes.get(theme, themes["default"])
+    base_css = themes.get(theme, themes["default"])
 
-        return base_css + """
+    return base_css + """
             * { margin: 0; padding: 0; box-sizing: border-box; }
 
             body {
@@ -469,14 +511,152 @@ class SlidesTool:
         """
 
 
+_CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.S)
+_CSS_SPACE_RE = re.compile(r'\s+')
+_CSS_PUNCT_RE = re.compile(r'\s*([{}:;,>])\s*')
+
+
+def _minify_css(css: str) -> str:
+    """去掉註解與多餘空白（只在符號兩側刪空白，選擇器中的空白會保留一格）"""
+    css = _CSS_COMMENT_RE.sub('', css)
+    css = _CSS_SPACE_RE.sub(' ', css)
+    css = _CSS_PUNCT_RE.sub(r'\1', css)
+    return css.replace(';}', '}').strip()
+
+
+def _minify_js(js: str) -> str:
+    """去掉縮排、空行與整行註解；保留換行，不影響自動分號插入"""
+    lines = (line.strip() for line in js.splitlines())
+    return '\n'.join(line for line in lines if line and not line.startswith('//'))
+
+
+# 模組載入時就壓縮好，每次輸出直接取用
+_MINIFIED_CSS = {theme: _minify_css(_theme_css_source(theme)) for theme in ("default", "dark", "minimal")}
+
+_SLIDES_JS = _minify_js('''
+        let currentSlide = 0;
+        const slides = document.querySelectorAll('.slide');
+        const total = slides.length;
+
+        function showSlide(n) {
+            slides.forEach((s, i) => {
+                s.classList.toggle('active', i === n);
+            });
+            document.getElementById('progress').textContent = `${n + 1} / ${total}`;
+            document.getElementById('progressFill').style.width = `${((n + 1) / total) * 100}%`;
+        }
+
+        function nextSlide() {
+            currentSlide = (currentSlide + 1) % total;
+            showSlide(currentSlide);
+        }
+
+        function prevSlide() {
+            currentSlide = (currentSlide - 1 + total) % total;
+            showSlide(currentSlide);
+        }
+
+        function toggleFullscreen() {
+            if (!document.fullscreenElement) {
+                document.documentElement.requestFullscreen();
+            } else {
+                document.exitFullscreen();
+            }
+        }
+
+        // 鍵盤控制
+        document.addEventListener('keydown', (e) => {
+            if (e.key === 'ArrowRight' || e.key === ' ' || e.key === 'Enter') {
+                e.preventDefault();
+                nextSlide();
+            }
+            if (e.key === 'ArrowLeft' || e.key === 'Backspace') {
+                e.preventDefault();
+                prevSlide();
+            }
+            if (e.key === 'f' || e.key === 'F') {
+                toggleFullscreen();
+            }
+            if (e.key === 'Home') {
+                currentSlide = 0;
+                showSlide(0);
+            }
+            if (e.key === 'End') {
+                currentSlide = total - 1;
+                showSlide(currentSlide);
+            }
+        });
+
+        // 觸控支援
+        let touchStartX = 0;
+        document.addEventListener('touchstart', (e) => {
+            touchStartX = e.touches[0].clientX;
+        });
+        document.addEventListener('touchend', (e) => {
+            const diff = touchStartX - e.changedTouches[0].clientX;
+            if (Math.abs(diff) > 50) {
+                if (diff > 0) nextSlide();
+                else prevSlide();
+            }
+        });
+
+        // 初始化
+        showSlide(0);
+        hljs.highlightAll();
+''')
+
+
+def _get_theme_css(theme: str) -> str:
+    """取得主題 CSS（已壓縮）"""
+    return _MINIFIED_CSS.get(theme) or _MINIFIED_CSS["default"]
+
+
+@lru_cache(maxsize=32)
+def _html_prefix(title: str, theme: str) -> bytes:
+    """簡報 HTML 的開頭（head、CSS 到投影片容器）"""
+    return f'''<!DOCTYPE html>
+<html lang="zh-TW">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.9.0/styles/github-dark.min.css">
+    <script src="https://cdnjs.cloudflare.com/ajax/libs/highlight.js/11.9.0/highlight.min.js"></script>
+    <style>
+        {_get_theme_css(theme)}
+    </style>
+</head>
+<body>
+    <div class="slides-container">
+        '''.encode('utf-8')
+
+
+@lru_cache(maxsize=32)
+def _html_suffix(total: int) -> bytes:
+    """簡報 HTML 的結尾（控制列與 JS）"""
+    return f'''
+    </div>
+
+    <div class="controls">
+        <button onclick="prevSlide()" title="上一張 (←)">◀</button>
+        <span id="progress">1 / {total}</span>
+        <button onclick="nextSlide()" title="下一張 (→)">▶</button>
+        <button onclick="toggleFullscreen()" title="全螢幕 (F)">⛶</button>
+    </div>
+
+    <div class="progress-bar">
+        <div class="progress-fill" id="progressFill"></div>
+    </div>
+
+    <script>
+{_SLIDES_JS}
+    </script>
+</body>
+</html>'''.encode('utf-8')
+
+
 # 同步包裝器
 def generate_slides_sync(markdown_content: str, output_path: str,
                          title: str = "Presentation", theme: str = "default") -> dict:
     """同步版本的簡報生成"""
-    import asyncio
-
-    async def _run():
-        tool = SlidesTool()
-        return await tool.generate(markdown_content, output_path, title, theme)
-
-    return asyncio.run(_run())
+    return SlidesTool()._generate_impl(markdown_content, output_path, title, theme)
@@ -3,34 +3,29 @@ Monus UI - 精美的終端介面
 使用 Rich 庫提供進度條、狀態顯示、表格等
 """
 import sys
-import io
 import os
+from types import MappingProxyType
+from typing import TYPE_CHECKING
 
-# Windows UTF-8 支援 (只在尚未設定時執行)
-if sys.platform == "win32":
+# Windows UTF-8 支援 (只在尚未設定時執行；reload 時模組 globals 會保留旗標)
+if sys.platform == "win32" and not globals().get("_WIN_UTF8_SET"):
     # 設定環境變數讓 Python 使用 UTF-8
     os.environ.setdefault("PYTHONIOENCODING", "utf-8")
 
-    # 只在需要時包裝 stdout/stderr
-    if hasattr(sys.stdout, 'buffer') and not isinstance(sys.stdout, io.TextIOWrapper):
-        try:
-            sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-            sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
-        except Exception:
-            pass  # 已經被包裝過了
-
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
-from rich.table import Table
-from rich.live import Live
-from rich.layout import Layout
-from rich.text import Text
-from rich.style import Style
-from rich.box import ROUNDED, DOUBLE
-from rich import print as rprint
-from typing import Optional
-import time
+    # 直接改現有串流的編碼，不另外包一層 TextIOWrapper
+    for _stream in (sys.stdout, sys.stderr):
+        if hasattr(_stream, 'reconfigure'):
+            try:
+                _stream.reconfigure(encoding='utf-8', errors='replace')
+            except Exception:
+                pass  # 已被替換成不支援的串流
+    _WIN_UTF8_SET = True
+
+# 其餘 rich 子模組（Panel / Table / Progress / box）在用到時才載入，縮短 CLI 啟動時間
+from rich.console import Console, Group
+
+if TYPE_CHECKING:
+    from rich.panel import Panel
 
 
 # 強制使用 UTF-8
@@ -49,9 +44,8 @@ COLORS = {
 }
 
 
-def print_banner():
-    """印出精美的 Monus 標誌"""
-    banner = """
+# Monus 標誌（Rich markup）
+_BANNER = """
 [bold #00d4aa]    ╔═══════════════════════════════════════════╗
     ║                                           ║
     ║   [bold white]███╗   ███╗ ██████╗ ███╗   ██╗██╗   ██╗███████╗[/]  ║
@@ -65,14 +59,33 @@ def print_banner():
     ║   [dim]Powered by DeepSeek + 5 Agent System[/]    ║
     ╚═══════════════════════════════════════════╝[/]
     """
-    console.print(banner)
+
+# print_config 表格欄位：(名稱, 樣式)
+_CONFIG_COLUMNS = (("Key", "bold cyan"), ("Value", "white"))
+
+# print_agents 顯示的 Agent：(圖示, 名稱, 說明, 顏色)
+_AGENTS = (
+    ("🧠", "Planner", "Task decomposition & planning", "#00d4aa"),
+    ("💭", "Reasoner", "Thought generation & conflict resolution", "#7c3aed"),
+    ("📊", "Evaluator", "Result evaluation & quality check", "#3b82f6"),
+    ("✅", "Verifier", "Rule-based verification", "#10b981"),
+    ("🎨", "Renderer", "PDF / Slides / Web output", "#f59e0b"),
+)
+
+
+def print_banner():
+    """印出精美的 Monus 標誌"""
+    console.print(_BANNER)
 
 
 def print_config(goal: str, model: str, output_format: str, theme: str):
     """顯示任務配置"""
+    from rich.table import Table
+    from rich.box import ROUNDED
+
     table = Table(box=ROUNDED, show_header=False, border_style="dim")
-    table.add_column("Key", style="bold cyan")
-    table.add_column("Value", style="white")
+    for name, style in _CONFIG_COLUMNS:
+        table.add_column(name, style=style)
 
     table.add_row("📎 Goal", goal)
     table.add_row("🤖 Model", model)
@@ -80,24 +93,63 @@ def print_config(goal: str, model: str, output_format: str, theme: str):
     if output_format in ["slides", "all"]:
         table.add_row("🎨 Theme", theme)
 
-    console.print(table)
-    console.print()
+    console.print(Group(table, ""))
 
 
 def print_agents():
     """顯示 Agent 初始化狀態"""
-    agents = [
-        ("🧠", "Planner", "Task decomposition & planning", "#00d4aa"),
-        ("💭", "Reasoner", "Thought generation & conflict resolution", "#7c3aed"),
-        ("📊", "Evaluator", "Result evaluation & quality check", "#3b82f6"),
-        ("✅", "Verifier", "Rule-based verification", "#10b981"),
-        ("🎨", "Renderer", "PDF / Slides / Web output", "#f59e0b"),
-    ]
-
-    console.print("[bold]Agents Ready:[/]")
-    for icon, name, desc, color in agents:
-        console.print(f"  {icon} [bold {color}]{name}[/] [dim]- {desc}[/]")
-    console.print()
+    # 組成一個 Group 一次輸出，減少終端寫入次數
+    console.print(Group(
+        console.render_str("[bold]Agents Ready:[/]"),
+        *(console.render_str(f"  {icon} [bold {color}]{name}[/] [dim]- {desc}[/]")
+          for icon, name, desc, color in _AGENTS),
+        "",
+    ))
+
+
+# 截斷過長文字
+_DOTS = "..."
+ACTION_INPUT_MAX = 50
+SUGGESTION_MAX = 80
+
+
+def _ellipsize(s: str, n: int) -> str:
+    """超過 n 個字元時截斷並補上 ..."""
+    return s if len(s) <= n else s[:n] + _DOTS
+
+
+# 進度條：寬度固定，全部 BAR_WIDTH + 1 種樣子先建好
+BAR_WIDTH = 20
+_BARS = tuple("█" * i + "░" * (BAR_WIDTH - i) for i in range(BAR_WIDTH + 1))
+
+# 以下對照表皆為唯讀，避免被呼叫端意外修改
+# 階段：(圖示, 名稱, 顏色)
+_PHASES = MappingProxyType({
+    "planning": ("🧠", "Planning", "#00d4aa"),
+    "searching": ("🔍", "Searching", "#3b82f6"),
+    "extracting": ("📥", "Extracting", "#7c3aed"),
+    "analyzing": ("💭", "Analyzing", "#f59e0b"),
+    "writing": ("✍️", "Writing Report", "#10b981"),
+    "rendering": ("🎨", "Rendering Output", "#ec4899"),
+    "verifying": ("✅", "Verifying", "#10b981"),
+})
+
+# 步驟狀態圖示
+_STEP_ICONS = MappingProxyType({
+    "running": "[bold yellow]⟳[/]",
+    "done": "[bold green]✓[/]",
+    "failed": "[bold red]✗[/]",
+    "skipped": "[dim]○[/]",
+})
+
+# 工具圖示
+_TOOL_ICONS = MappingProxyType({
+    "browser.search": "🔍",
+    "browser.open": "🌐",
+    "browser.extract": "📥",
+    "fs.write": "💾",
+    "code.run": "⚡",
+})
 
 
 class MonusUI:
@@ -113,6 +165,8 @@ class MonusUI:
 
     def start_run(self, run_id: str, goal: str):
         """開始執行任務"""
+        from rich.panel import Panel
+
         self.console.print(Panel(
             f"[bold]Run ID:[/] {run_id}",
             title="[bold #00d4aa]Starting Task[/]",
@@ -122,29 +176,15 @@ class MonusUI:
     def update_phase(self, phase: str):
         """更新當前階段"""
         self.current_phase = phase
-        phases = {
-            "planning": ("🧠", "Planning", "#00d4aa"),
-            "searching": ("🔍", "Searching", "#3b82f6"),
-            "extracting": ("📥", "Extracting", "#7c3aed"),
-            "analyzing": ("💭", "Analyzing", "#f59e0b"),
-            "writing": ("✍️", "Writing Report", "#10b981"),
-            "rendering": ("🎨", "Rendering Output", "#ec4899"),
-            "verifying": ("✅", "Verifying", "#10b981"),
-        }
-        if phase in phases:
-            icon, name, color = phases[phase]
+        entry = _PHASES.get(phase)
+        if entry:
+            icon, name, color = entry
             self.console.print(f"\n[bold {color}]{icon} {name}...[/]")
 
     def update_step(self, step: str, status: str = "running"):
         """更新當前步驟"""
         self.current_step = step
-        icons = {
-            "running": "[bold yellow]⟳[/]",
-            "done": "[bold green]✓[/]",
-            "failed": "[bold red]✗[/]",
-            "skipped": "[dim]○[/]",
-        }
-        icon = icons.get(status, "•")
+        icon = _STEP_ICONS.get(status, "•")
         self.console.print(f"  {icon} {step}")
 
     def update_iteration(self, iteration: int, max_iterations: int):
@@ -152,9 +192,7 @@ class MonusUI:
         self.iteration = iteration
         self.max_iterations = max_iterations
         progress = iteration / max_iterations
-        bar_width = 20
-        filled = int(progress * bar_width)
-        bar = "█" * filled + "░" * (bar_width - filled)
+        bar = _BARS[max(0, min(int(progress * BAR_WIDTH), BAR_WIDTH))]
         self.console.print(f"\n[dim]Progress:[/] [{bar}] {iteration}/{max_iterations}")
 
     def update_sources(self, count: int):
@@ -164,16 +202,9 @@ class MonusUI:
 
     def show_action(self, tool: str, input_data: str):
         """顯示正在執行的動作"""
-        tool_icons = {
-            "browser.search": "🔍",
-            "browser.open": "🌐",
-            "browser.extract": "📥",
-            "fs.write": "💾",
-            "code.run": "⚡",
-        }
-        icon = tool_icons.get(tool, "•")
+        icon = _TOOL_ICONS.get(tool, "•")
         # 截斷過長的輸入
-        display_input = input_data[:50] + "..." if len(input_data) > 50 else input_data
+        display_input = _ellipsize(input_data, ACTION_INPUT_MAX)
         self.console.print(f"  {icon} [bold]{tool}[/] [dim]{display_input}[/]")
 
     def show_result(self, success: bool, message: str = ""):
@@ -188,6 +219,9 @@ class MonusUI:
         if not outputs:
             return
 
+        from rich.table import Table
+        from rich.box import ROUNDED
+
         table = Table(
             title="[bold]Output Files[/]",
             box=ROUNDED,
@@ -197,20 +231,27 @@ class MonusUI:
         table.add_column("Path", style="cyan")
         table.add_column("Status", justify="center")
 
-        for fmt, info in outputs.items():
-            if info:
-                status = "[green]✓[/]" if info.get("success") else "[red]✗[/]"
-                path = info.get("path", "N/A")
-                extra = ""
-                if fmt == "slides" and info.get("slides_count"):
-                    extra = f" ({info['slides_count']} slides)"
-                table.add_row(fmt.upper(), path + extra, status)
+        rows = [
+            (
+                fmt.upper(),
+                info.get("path", "N/A") + (
+                    f" ({info['slides_count']} slides)"
+                    if fmt == "slides" and info.get("slides_count") else ""
+                ),
+                "[green]✓[/]" if info.get("success") else "[red]✗[/]",
+            )
+            for fmt, info in outputs.items() if info
+        ]
+        for row in rows:
+            table.add_row(*row)
 
-        self.console.print()
-        self.console.print(table)
+        self.console.print(Group("", table))
 
     def show_verification(self, verification: dict):
         """顯示驗證結果"""
+        from rich.table import Table
+        from rich.box import ROUNDED
+
         table = Table(
             title="[bold]Verification Results[/]",
             box=ROUNDED,
@@ -220,16 +261,22 @@ class MonusUI:
         table.add_column("Status", justify="center")
         table.add_column("Message")
 
-        for r in verification.get("results", []):
-            status = "[green]PASS[/]" if r["passed"] else "[red]FAIL[/]"
-            rule = r["rule"].replace("_", " ").title()
-            table.add_row(rule, status, r["message"])
+        rows = [
+            (r["rule"].replace("_", " ").title(),
+             "[green]PASS[/]" if r["passed"] else "[red]FAIL[/]",
+             r["message"])
+            for r in verification.get("results", [])
+        ]
+        for row in rows:
+            table.add_row(*row)
 
-        self.console.print()
-        self.console.print(table)
+        self.console.print(Group("", table))
 
     def show_final_result(self, success: bool, run_id: str, quality_score: float = None):
         """顯示最終結果"""
+        from rich.panel import Panel
+        from rich.box import DOUBLE
+
         if success:
             panel = Panel(
                 f"[bold green]Task Completed Successfully![/]\n\n"
@@ -247,25 +294,27 @@ class MonusUI:
                 border_style="red",
                 box=DOUBLE
             )
-        self.console.print()
-        self.console.print(panel)
+        self.console.print(Group("", panel))
 
     def show_suggestions(self, suggestions: list):
         """顯示改進建議"""
         if not suggestions:
             return
 
-        self.console.print("\n[bold yellow]💡 Suggestions for Improvement:[/]")
+        lines = [self.console.render_str("\n[bold yellow]💡 Suggestions for Improvement:[/]")]
         for i, s in enumerate(suggestions[:3], 1):  # 只顯示前 3 個
             # 截斷過長的建議
-            display_s = s[:80] + "..." if len(s) > 80 else s
-            self.console.print(f"  {i}. [dim]{display_s}[/]")
+            display_s = _ellipsize(s, SUGGESTION_MAX)
+            lines.append(self.console.render_str(f"  {i}. [dim]{display_s}[/]"))
+        self.console.print(Group(*lines))
 
 
 class ProgressUI:
     """進度條 UI"""
 
     def __init__(self):
+        from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+
         self.progress = Progress(
             SpinnerColumn(),
             TextColumn("[bold blue]{task.description}"),
@@ -292,8 +341,10 @@ class ProgressUI:
         self.progress.stop()
 
 
-def create_status_panel(phase: str, step: str, iteration: int, sources: int) -> Panel:
+def create_status_panel(phase: str, step: str, iteration: int, sources: int) -> "Panel":
     """建立狀態面板"""
+    from rich.panel import Panel
+
     content = f"""
 [bold]Phase:[/] {phase}
 [bold]Step:[/] {step}
@@ -3,36 +3,198 @@ Monus Web Server - FastAPI 後端
 提供 API 讓前端呼叫執行任務
 """
 import asyncio
+import hashlib
+import heapq
+import itertools
 import json
 import os
+import re
+import sqlite3
 import sys
+import time
+from collections import OrderedDict
+from collections.abc import MutableMapping
 from pathlib import Path
-from datetime import datetime
 from typing import Optional
 from contextlib import asynccontextmanager
+from functools import lru_cache
+
+# 路徑常數（只在載入時計算一次）
+BASE_DIR = Path(__file__).resolve().parent.parent
+RUNS_DIR = BASE_DIR / "runs"
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+SANDBOX_DIR = BASE_DIR / "sandbox_workspace"
+INDEX_HTML = STATIC_DIR / "index.html"
+CODE_HTML = STATIC_DIR / "code.html"
+RUNS_DIR_STR = str(RUNS_DIR)
 
 # 確保可以 import 本地模組
-sys.path.insert(0, str(Path(__file__).parent.parent))
+sys.path.insert(0, str(BASE_DIR))
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse
 from pydantic import BaseModel
 
-from agent.planner import Planner
-from agent.reasoner import Reasoner
-from agent.evaluator import Evaluator
-from agent.verifier import Verifier
-from agent.memory import Memory
-from agent.loop import AgentLoop
-from agent.coder import Coder
-from tools.sandbox import SandboxTool
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+    HAS_ORJSON = True
+except ImportError:
+    DefaultJSONResponse = JSONResponse
+    HAS_ORJSON = False
+
+# Agent 相關模組會連帶載入 LLM SDK，改在用到時才 import（見 _get_agents 與各 handler）
+from agent.run_index import RUN_OUTPUTS, collect_outputs, get_run_index
+
+
+class TTLDict(MutableMapping):
+    """
+    有上限、會過期的 dict：每筆寫入後 ttl 秒失效，超過 maxsize 時淘汰最舊的
+
+    所有項目的 ttl 相同，依寫入順序排列即依到期時間排列，只需檢查最前面幾筆
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()  # key -> (到期時間, value)
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._data:
+            expires_at, _ = next(iter(self._data.values()))
+            if expires_at > now:
+                break
+            self._data.popitem(last=False)
+
+    def __getitem__(self, key):
+        self._expire()
+        return self._data[key][1]
+
+    def __setitem__(self, key, value):
+        self._data.pop(key, None)
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._expire()
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __iter__(self):
+        self._expire()
+        return iter(list(self._data))
+
+    def __len__(self):
+        self._expire()
+        return len(self._data)
+
+
+# 全域任務管理（有上限並會過期，被放棄的任務不會一直佔用記憶體）
+active_tasks = TTLDict(maxsize=10_000, ttl=7200)
+task_progress = TTLDict(maxsize=10_000, ttl=3600)
+
+
+def _dumps(data) -> str:
+    """序列化成 JSON 字串（有 orjson 時用 orjson）"""
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def _loads(raw):
+    """解析 JSON（bytes 或 str）；bytes 直接解析，不必先解碼"""
+    if HAS_ORJSON:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+@lru_cache(maxsize=8)
+def _get_agents(model: str) -> tuple:
+    """
+    依模型共用 Planner / Reasoner / Evaluator / Verifier
+
+    這些元件只持有設定與 OpenAI client（本身可跨 task 共用、保有連線池），
+    不保存任務狀態；每個任務各自的狀態在 Memory 與 AgentLoop 中
+    """
+    from agent.planner import Planner
+    from agent.reasoner import Reasoner
+    from agent.evaluator import Evaluator
+    from agent.verifier import Verifier
+
+    return (
+        Planner(model=model),
+        Reasoner(model=model),
+        Evaluator(model=model),
+        Verifier(min_sources=5, min_word_count=800),
+    )
+
+
+async def _receive_json(websocket: WebSocket):
+    """接收一則 JSON 訊息（text 或 binary frame 皆可）"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    raw = message.get("bytes")
+    return _loads(raw if raw is not None else message["text"])
+
+
+async def _send_json(websocket: WebSocket, data: dict):
+    """送出 JSON 訊息（text frame，前端以 JSON.parse 解析）"""
+    await websocket.send_text(_dumps(data))
+
+
+# file_chunk 合併：累積到一定大小或經過一定時間才送出一次
+CHUNK_FLUSH_SIZE = 512
+CHUNK_FLUSH_INTERVAL = 0.02
 
+_SENTINEL = object()
 
-# 全域任務管理
-active_tasks: dict = {}
-task_progress: dict = {}
+
+async def _iter_in_thread(iterable):
+    """
+    在 thread 中逐一取出同步 iterator 的元素
+
+    coder 的串流 generator 會同步等待 LLM 回應，直接在 async 函式裡 for 會卡住
+    整個 event loop，其他連線都無法推送訊息
+    """
+    loop = asyncio.get_running_loop()
+    it = iter(iterable)
+    while True:
+        item = await loop.run_in_executor(None, next, it, _SENTINEL)
+        if item is _SENTINEL:
+            return
+        yield item
+
+
+async def _stream_file(websocket: WebSocket, file_path: str, chunks) -> str:
+    """把 coder 串流出的片段合併後以 file_chunk 推送給前端，回傳完整內容"""
+    # 迴圈內會用到的屬性與方法先綁成區域變數
+    now = asyncio.get_running_loop().time
+    send_text = websocket.send_text
+    parts = []
+    append = parts.append
+    pending = []
+    pending_len = 0
+    # file_chunk 訊息的固定前綴，每次只需補上 chunk
+    prefix = '{"type":"file_chunk","file":' + _dumps(file_path) + ',"chunk":'
+
+    last_flush = now()
+    async for chunk in _iter_in_thread(chunks):
+        append(chunk)
+        pending.append(chunk)
+        pending_len += len(chunk)
+        if pending_len >= CHUNK_FLUSH_SIZE or now() - last_flush >= CHUNK_FLUSH_INTERVAL:
+            await send_text(prefix + _dumps("".join(pending)) + "}")
+            pending.clear()
+            pending_len = 0
+            last_flush = now()
+    if pending:
+        await send_text(prefix + _dumps("".join(pending)) + "}")
+    return "".join(parts)
 
 
 class TaskRequest(BaseModel):
@@ -53,6 +215,10 @@ class TaskStatus(BaseModel):
     outputs: Optional[dict] = None
 
 
+# WebSocketUI 待送訊息的上限
+WS_QUEUE_SIZE = 256
+
+
 class WebSocketUI:
     """WebSocket 版本的 UI，用於即時推送進度"""
 
@@ -63,119 +229,197 @@ class WebSocketUI:
         self.sources_count = 0
         self.iteration = 0
         self.max_iterations = 20
-
-    async def _send(self, data: dict):
-        """發送訊息到 WebSocket"""
+        # 上次送出的進度百分比；沒變就不再送
+        self._last_progress = -1
+        # 所有訊息排入佇列，由單一背景 task 依序送出；積壓的訊息合併成一個 batch frame
+        # 佇列有上限：客戶端收太慢時丟掉最舊的訊息，不讓記憶體無限成長
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=WS_QUEUE_SIZE)
+        # 第一次送出失敗（連線已斷）後就不再排入或送出任何訊息
+        self._alive = True
+        self._sender = asyncio.create_task(self._drain())
+
+        # 高頻訊息的預先序列化樣板：固定欄位（type、task_id）只編碼一次
+        tid = _dumps(task_id).replace("%", "%%")
+        self._progress_tmpl = (
+            '{"type":"progress","task_id":' + tid +
+            ',"iteration":%d,"max_iterations":%d,"progress":%d}'
+        )
+        self._sources_tmpl = '{"type":"sources","task_id":' + tid + ',"count":%d}'
+        self._action_tmpl = '{"type":"action","task_id":' + tid + ',"tool":%s,"input":%s}'
+
+    def _put(self, payload: str):
+        """排入已序列化的訊息（不阻塞呼叫端；佇列滿時丟掉最舊的一則）"""
+        if not self._alive:
+            return
         try:
-            await self.websocket.send_json(data)
-        except Exception:
-            pass
+            self._queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            self._queue.get_nowait()
+            self._queue.put_nowait(payload)
+
+    def _send(self, data: dict):
+        """序列化後排入待送訊息"""
+        if self._alive:
+            self._put(_dumps(data))
+
+    async def _drain(self):
+        """背景送出佇列中的訊息，直到收到結束標記 None"""
+        while True:
+            batch = [await self._queue.get()]
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+
+            done = batch[-1] is None
+            if done:
+                batch.pop()
+            if batch:
+                try:
+                    # 佇列中已是 JSON 字串，合併時直接串接
+                    if len(batch) == 1:
+                        await self.websocket.send_text(batch[0])
+                    else:
+                        await self.websocket.send_text('{"type":"batch","items":[' + ",".join(batch) + "]}")
+                except Exception:
+                    self._alive = False
+                    return
+            if done:
+                return
+
+    async def close(self):
+        """送完佇列中剩餘的訊息後結束背景 task"""
+        if not self._sender.done():
+            # 結束標記不能被丟掉，佇列滿時等待背景 task 消化
+            await self._queue.put(None)
+        await self._sender
 
     def start_run(self, run_id: str, goal: str):
-        asyncio.create_task(self._send({
+        self._send({
             "type": "start",
             "task_id": self.task_id,
             "run_id": run_id,
             "goal": goal
-        }))
+        })
 
     def update_phase(self, phase: str):
         self.current_phase = phase
-        asyncio.create_task(self._send({
+        self._send({
             "type": "phase",
             "task_id": self.task_id,
             "phase": phase
-        }))
+        })
 
     def update_step(self, step: str, status: str = "running"):
-        asyncio.create_task(self._send({
+        self._send({
             "type": "step",
             "task_id": self.task_id,
             "step": step,
             "status": status
-        }))
+        })
 
     def update_iteration(self, iteration: int, max_iterations: int):
         self.iteration = iteration
         self.max_iterations = max_iterations
         progress = int((iteration / max_iterations) * 100)
-        asyncio.create_task(self._send({
-            "type": "progress",
-            "task_id": self.task_id,
-            "iteration": iteration,
-            "max_iterations": max_iterations,
-            "progress": progress
-        }))
+        if progress == self._last_progress:
+            return
+        self._last_progress = progress
+        self._put(self._progress_tmpl % (iteration, max_iterations, progress))
 
     def update_sources(self, count: int):
         self.sources_count = count
-        asyncio.create_task(self._send({
-            "type": "sources",
-            "task_id": self.task_id,
-            "count": count
-        }))
+        self._put(self._sources_tmpl % count)
 
     def show_action(self, tool: str, input_data: str):
-        asyncio.create_task(self._send({
-            "type": "action",
-            "task_id": self.task_id,
-            "tool": tool,
-            "input": input_data[:100]
-        }))
+        self._put(self._action_tmpl % (_dumps(tool), _dumps(input_data[:100])))
 
     def show_result(self, success: bool, message: str = ""):
-        asyncio.create_task(self._send({
+        self._send({
             "type": "result",
             "task_id": self.task_id,
             "success": success,
             "message": message
-        }))
+        })
 
     def show_outputs(self, outputs: dict):
-        asyncio.create_task(self._send({
+        self._send({
             "type": "outputs",
             "task_id": self.task_id,
             "outputs": outputs
-        }))
+        })
 
     def show_verification(self, verification: dict):
-        asyncio.create_task(self._send({
+        self._send({
             "type": "verification",
             "task_id": self.task_id,
             "verification": verification
-        }))
+        })
 
     def show_final_result(self, success: bool, run_id: str, quality_score: float = None):
-        asyncio.create_task(self._send({
+        self._send({
             "type": "complete",
             "task_id": self.task_id,
             "success": success,
             "run_id": run_id,
             "quality_score": quality_score
-        }))
+        })
 
     def show_suggestions(self, suggestions: list):
-        asyncio.create_task(self._send({
+        self._send({
             "type": "suggestions",
             "task_id": self.task_id,
             "suggestions": suggestions
-        }))
+        })
+
+
+def _load_page(path: Path) -> Optional[tuple]:
+    """讀取靜態頁面，回傳 (內容, ETag)；檔案不存在時回傳 None"""
+    try:
+        body = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    return body, '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+# 健康檢查的回應固定不變，預先編碼好
+_HEALTH_RESPONSE = Response(
+    content=b'{"status":"ok","version":"1.0.0"}', media_type="application/json"
+)
 
 
 # FastAPI 應用
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """應用生命週期"""
+    global sandbox, browser_pool
     print("[Monus] Web Server starting...")
+    from tools.sandbox import SandboxTool
+    sandbox = SandboxTool(workspace_dir=str(SANDBOX_DIR))
+    # 首頁在啟動時讀一次，之後直接回傳記憶體中的 bytes
+    app.state.index_page = _load_page(INDEX_HTML)
+    RUNS_DIR.mkdir(parents=True, exist_ok=True)
+    # 索引只是快取：啟動時與 runs/ 對齊（補上新增、變動的 run，移除已刪除的）
+    try:
+        await asyncio.to_thread(run_index.reindex)
+    except (OSError, sqlite3.Error) as e:
+        print(f"[Monus] Run index unavailable: {e}")
     yield
     print("[Monus] Web Server shutting down...")
+    if browser_pool is not None:
+        await browser_pool.close()
+        browser_pool = None
+    # 有跑過研究任務才會載入 tools.browser；停止共用的搜尋批次 dispatcher
+    browser_module = sys.modules.get("tools.browser")
+    if browser_module is not None:
+        await browser_module.get_search_processor().close()
+    run_index.close()
 
 
 app = FastAPI(
     title="Monus API",
     description="Autonomous Research Agent API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=DefaultJSONResponse
 )
 
 # CORS 設定
@@ -187,106 +431,219 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 壓縮較大的 HTTP 回應（執行記錄列表、HTML、報告；WebSocket 不受影響）
+app.add_middleware(GZipMiddleware, minimum_size=512)
+
+# 執行記錄列表的瀏覽器快取秒數（前端在任務完成時會略過快取重新取得）
+RUNS_LIST_MAX_AGE = 5
+
 # 靜態檔案
-runs_path = Path(__file__).parent.parent / "runs"
-if runs_path.exists():
-    app.mount("/runs", StaticFiles(directory=str(runs_path)), name="runs")
+# 執行結束後不再變動的最終產物；logs.txt、sources.json、task.json 等在執行中會持續更新
+_FINAL_ARTIFACTS = frozenset(filename for _, filename in RUN_OUTPUTS)
+_FINISHED_STATUSES = frozenset(("completed", "failed"))
+
+
+def _run_finished(run_dir: str) -> bool:
+    try:
+        return _load_task(Path(run_dir) / "task.json").get("status") in _FINISHED_STATUSES
+    except (OSError, ValueError):
+        return False
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """已結束的 run 的最終產物讓瀏覽器長期快取，其餘檔案每次以 ETag 重新驗證"""
+
+    async def get_response(self, path: str, scope):
+        # 只提供 <run_id>/ 底下的檔案；runs/ 最上層不該有對外的檔案
+        if os.sep not in path:
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(self, full_path, *args, **kwargs):
+        response = super().file_response(full_path, *args, **kwargs)
+        run_dir, filename = os.path.split(full_path)
+        if filename in _FINAL_ARTIFACTS and _run_finished(run_dir):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
+
+
+# 一律掛載；目錄由 lifespan 建立，啟動時還沒有 runs/ 也能服務之後產生的檔案
+app.mount(
+    "/runs", ImmutableStaticFiles(directory=RUNS_DIR_STR, html=False, check_dir=False), name="runs"
+)
 
 
 @app.get("/")
-async def root():
+async def root(request: Request):
     """首頁 - 返回前端 HTML"""
-    return FileResponse(Path(__file__).parent / "static" / "index.html")
+    page = request.app.state.index_page
+    if page is None:
+        raise HTTPException(status_code=404, detail="index.html not found")
+    body, etag = page
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="text/html", headers={"ETag": etag})
 
 
 @app.get("/api/health")
 async def health():
     """健康檢查"""
-    return {"status": "ok", "version": "1.0.0"}
+    return _HEALTH_RESPONSE
 
 
-@app.get("/api/runs")
-async def list_runs():
-    """列出所有執行記錄"""
-    runs_dir = Path(__file__).parent.parent / "runs"
-    if not runs_dir.exists():
-        return {"runs": []}
+# list_runs 快取：(簽章, 結果)；簽章不變就不重新讀取 task.json
+_runs_cache: Optional[tuple] = None
+
+# .monus/runs.db：記錄最近的 run，列表時不必掃描整個 runs/
+run_index = get_run_index(RUNS_DIR)
+
+
+# task.json 解析結果快取：路徑 -> (mtime_ns, 檔案大小, dict)，超過上限時淘汰最早放入的
+TASK_CACHE_SIZE = 512
+_task_cache: OrderedDict = OrderedDict()
+
+
+def _load_task(path: Path) -> dict:
+    """讀取並解析 task.json；mtime 與大小都沒變就直接回傳上次的結果"""
+    st = os.stat(path)
+    key = str(path)
+    cached = _task_cache.get(key)
+    if cached is not None and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+        return cached[2]
+    task = _loads(path.read_bytes())
+    _task_cache[key] = (st.st_mtime_ns, st.st_size, task)
+    while len(_task_cache) > TASK_CACHE_SIZE:
+        try:
+            _task_cache.popitem(last=False)
+        except KeyError:
+            break
+    return task
+
+
+def _mtime_ns(path: Path) -> int:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _scan_runs(runs_dir: Path, limit: int = 20) -> list:
+    """列出最近的執行記錄（同步，會在 thread 中執行）"""
+    # 有索引就一次查詢取回整頁，不必逐一讀取 task.json
+    if run_index.db_path.exists():
+        try:
+            return run_index.recent(limit)
+        except (OSError, sqlite3.Error, ValueError):
+            pass
+    return _scan_runs_from_dir(runs_dir, limit)
+
+
+def _scan_runs_from_dir(runs_dir: Path, limit: int = 20) -> list:
+    """沒有索引時直接掃描 runs/ 目錄"""
+    global _runs_cache
+    try:
+        with os.scandir(runs_dir) as it:
+            # 只需最新的 limit 筆：部分選取 O(N log limit)，不必整份排序
+            run_names = heapq.nlargest(limit, (e.name for e in it if e.is_dir()))
+    except FileNotFoundError:
+        return []
+
+    # 新增輸出檔會更新執行目錄的 mtime；任務狀態更新會改 task.json 的 mtime
+    signature = tuple(
+        (name, _mtime_ns(runs_dir / name), _mtime_ns(runs_dir / name / "task.json"))
+        for name in run_names
+    )
+    cached = _runs_cache
+    if cached is not None and cached[0] == signature:
+        return cached[1]
 
     runs = []
-    for run_dir in sorted(runs_dir.iterdir(), reverse=True)[:20]:
-        task_file = run_dir / "task.json"
-        if task_file.exists():
-            try:
-                task = json.loads(task_file.read_text(encoding="utf-8"))
-
-                # 檢查輸出檔案
-                outputs = {}
-                if (run_dir / "report.pdf").exists():
-                    outputs["pdf"] = f"/runs/{run_dir.name}/report.pdf"
-                if (run_dir / "slides.html").exists():
-                    outputs["slides"] = f"/runs/{run_dir.name}/slides.html"
-                if (run_dir / "index.html").exists():
-                    outputs["web"] = f"/runs/{run_dir.name}/index.html"
-                if (run_dir / "report.md").exists():
-                    outputs["markdown"] = f"/runs/{run_dir.name}/report.md"
-
-                runs.append({
-                    "id": run_dir.name,
-                    "goal": task.get("goal", "Unknown"),
-                    "status": task.get("status", "unknown"),
-                    "created_at": task.get("created_at", ""),
-                    "outputs": outputs,
-                    "steps_count": len(task.get("steps", []))
-                })
-            except Exception:
-                pass
+    for name in run_names:
+        run_dir = runs_dir / name
+        try:
+            task = _load_task(run_dir / "task.json")
+
+            # 檢查輸出檔案
+            outputs = collect_outputs(run_dir)
+
+            runs.append({
+                "id": name,
+                "goal": task.get("goal", "Unknown"),
+                "status": task.get("status", "unknown"),
+                "created_at": task.get("created_at", ""),
+                "outputs": outputs,
+                "steps_count": len(task.get("steps", []))
+            })
+        except FileNotFoundError:
+            continue
+        except Exception:
+            pass
 
-    return {"runs": runs}
+    _runs_cache = (signature, runs)
+    return runs
+
+
+@app.get("/api/runs")
+async def list_runs():
+    """列出所有執行記錄"""
+    # 檔案系統掃描是阻塞 I/O，丟到 thread 避免卡住 WebSocket 推送
+    runs = await asyncio.to_thread(_scan_runs, RUNS_DIR)
+    return DefaultJSONResponse(
+        content={"runs": runs},
+        headers={"Cache-Control": f"public, max-age={RUNS_LIST_MAX_AGE}"}
+    )
 
 
 @app.get("/api/runs/{run_id}")
 async def get_run(run_id: str):
     """取得特定執行記錄"""
-    run_dir = Path(__file__).parent.parent / "runs" / run_id
-    if not run_dir.exists():
+    run_dir = RUNS_DIR / run_id
+    # 磁碟 I/O 丟到 thread，不阻塞正在推送的 WebSocket
+    try:
+        # 檢查輸出檔案
+        outputs = await asyncio.to_thread(collect_outputs, run_dir)
+    except (FileNotFoundError, NotADirectoryError):
         raise HTTPException(status_code=404, detail="Run not found")
 
-    task_file = run_dir / "task.json"
-    if not task_file.exists():
+    try:
+        task = await asyncio.to_thread(_load_task, run_dir / "task.json")
+    except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Task file not found")
 
-    task = json.loads(task_file.read_text(encoding="utf-8"))
-
-    # 讀取報告內容
-    report_content = ""
-    report_file = run_dir / "report.md"
-    if report_file.exists():
-        report_content = report_file.read_text(encoding="utf-8")
-
-    # 檢查輸出檔案
-    outputs = {}
-    if (run_dir / "report.pdf").exists():
-        outputs["pdf"] = f"/runs/{run_id}/report.pdf"
-    if (run_dir / "slides.html").exists():
-        outputs["slides"] = f"/runs/{run_id}/slides.html"
-    if (run_dir / "index.html").exists():
-        outputs["web"] = f"/runs/{run_id}/index.html"
-
     return {
         "id": run_id,
         "goal": task.get("goal", ""),
         "status": task.get("status", ""),
         "created_at": task.get("created_at", ""),
         "steps": task.get("steps", []),
-        "outputs": outputs,
-        "report": report_content
+        "outputs": outputs
     }
 
 
+@app.get("/api/runs/{run_id}/report")
+async def get_run_report(run_id: str):
+    """取得報告 Markdown（直接串流檔案，不放進 get_run 的 JSON）"""
+    report_file = RUNS_DIR / run_id / "report.md"
+    if not report_file.is_file():
+        raise HTTPException(status_code=404, detail="Report not found")
+    return FileResponse(report_file, media_type="text/markdown; charset=utf-8")
+
+
+# task_id = 行程啟動時間（秒）_ PID _ 遞增序號：不必每次格式化時間，同一秒、多個 worker 也不會重複
+_TASK_ID_PREFIX = f"{time.time_ns() // 1_000_000_000}_{os.getpid()}_"
+_task_counter = itertools.count(1)
+
+
+def _new_task_id() -> str:
+    return f"{_TASK_ID_PREFIX}{next(_task_counter):06d}"
+
+
 @app.post("/api/tasks")
 async def create_task(request: TaskRequest):
     """建立新任務（非同步執行）"""
-    task_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    task_id = _new_task_id()
 
     # 記錄任務
     task_progress[task_id] = {
@@ -303,8 +660,76 @@ async def create_task(request: TaskRequest):
     }
 
 
-# 初始化 Sandbox（全域）
-sandbox = SandboxTool()
+# Sandbox（全域），在 lifespan 啟動時建立
+sandbox = None
+
+# 研究任務共用的 Chromium 池（每個 worker 各自一份，設為 0 則每個任務自行啟動瀏覽器）
+# 第一個研究任務才啟動，只看網頁或開多個 worker 時不會先開一堆瀏覽器
+BROWSER_POOL_SIZE = int(os.environ.get("MONUS_BROWSER_POOL_SIZE", "2"))
+browser_pool = None
+_browser_pool_lock = asyncio.Lock()
+_browser_pool_failed = False
+
+
+async def _get_browser_pool():
+    """取得（必要時啟動）瀏覽器池；啟動失敗就退回每個任務各自啟動，之後不再重試"""
+    global browser_pool, _browser_pool_failed
+    if BROWSER_POOL_SIZE <= 0 or _browser_pool_failed:
+        return None
+    async with _browser_pool_lock:
+        if browser_pool is None and not _browser_pool_failed:
+            from tools.browser import get_browser_pool
+            pool = get_browser_pool()
+            try:
+                await pool.start(BROWSER_POOL_SIZE)
+                browser_pool = pool
+            except Exception as e:
+                print(f"[Monus] Browser pool unavailable: {e}")
+                _browser_pool_failed = True
+                await pool.close()
+    return browser_pool
+
+# 專案檔案列表快取：專案名稱 -> (專案根目錄 mtime_ns, 檔案列表)
+_project_files_cache = TTLDict(256, 3600)
+
+
+async def _list_project_files(project_name: str) -> list:
+    """列出專案檔案；專案根目錄沒變動且未經由本服務寫入時沿用上次結果"""
+    try:
+        mtime = (SANDBOX_DIR / project_name).stat().st_mtime_ns
+    except FileNotFoundError:
+        mtime = 0
+    cached = _project_files_cache.get(project_name)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    files_result = await sandbox.list_files(project_name)
+    files = files_result.get("files", [])
+    _project_files_cache[project_name] = (mtime, files)
+    return files
+
+
+# 修改請求預設的目標：先找腳本檔，沒有才改 index.html
+_SCRIPT_EXTS = (".js", ".jsx")
+
+
+def _pick_target_file(files: list) -> Optional[str]:
+    """從專案檔案列表挑出修改請求的目標檔案"""
+    fallback = None
+    for f in files:
+        if f.get("type") != "file":
+            continue
+        path = f.get("path", "")
+        if path.endswith(_SCRIPT_EXTS) or "script" in path or "app" in path:
+            return path
+        if path == "index.html":
+            fallback = path
+    return fallback
+
+
+async def _write_project_file(project_name: str, file_path: str, content: str):
+    """寫入專案檔案，並讓該專案的檔案列表快取失效"""
+    await sandbox.write_file(project_name, file_path, content)
+    _project_files_cache.pop(project_name, None)
 
 
 @app.websocket("/ws/{task_id}")
@@ -314,24 +739,21 @@ async def websocket_endpoint(websocket: WebSocket, task_id: str):
 
     try:
         # 等待任務參數
-        data = await websocket.receive_json()
+        data = await _receive_json(websocket)
         goal = data.get("goal", "")
         output_format = data.get("output_format", "web")
         theme = data.get("theme", "default")
         model = data.get("model", "deepseek-chat")
 
         if not goal:
-            await websocket.send_json({"type": "error", "message": "Goal is required"})
+            await _send_json(websocket, {"type": "error", "message": "Goal is required"})
             return
 
-        # 建立 WebSocket UI
-        ws_ui = WebSocketUI(websocket, task_id)
-
         # 初始化 Planner 判斷任務類型
-        planner = Planner(model=model)
+        planner = _get_agents(model)[0]
         task_classification = planner.classify_task(goal)
 
-        await websocket.send_json({
+        await _send_json(websocket, {
             "type": "classification",
             "task_type": task_classification["type"],
             "template": task_classification.get("template"),
@@ -349,6 +771,8 @@ async def websocket_endpoint(websocket: WebSocket, task_id: str):
             )
         else:
             # === 研究模式 ===
+            # 建立 WebSocket UI
+            ws_ui = WebSocketUI(websocket, task_id)
             await run_research(
                 websocket, ws_ui, task_id, goal,
                 output_format, theme, model, planner
@@ -360,7 +784,7 @@ async def websocket_endpoint(websocket: WebSocket, task_id: str):
         import traceback
         traceback.print_exc()
         try:
-            await websocket.send_json({
+            await _send_json(websocket, {
                 "type": "error",
                 "task_id": task_id,
                 "message": str(e)
@@ -374,10 +798,11 @@ async def websocket_endpoint(websocket: WebSocket, task_id: str):
 
 async def run_research(websocket, ws_ui, task_id, goal, output_format, theme, model, planner):
     """執行研究任務"""
-    memory = Memory(runs_dir="runs")
-    reasoner = Reasoner(model=model)
-    evaluator = Evaluator(model=model)
-    verifier = Verifier(min_sources=5, min_word_count=800)
+    from agent.memory import Memory
+    from agent.loop import AgentLoop
+
+    memory = Memory(runs_dir=RUNS_DIR_STR, run_index=run_index)
+    _, reasoner, evaluator, verifier = _get_agents(model)
 
     agent = AgentLoop(
         memory=memory,
@@ -386,12 +811,19 @@ async def run_research(websocket, ws_ui, task_id, goal, output_format, theme, mo
         evaluator=evaluator,
         verifier=verifier,
         max_iterations=20,
-        ui=ws_ui
+        ui=ws_ui,
+        browser_pool=await _get_browser_pool()
     )
 
-    result = await agent.run(goal, output_format=output_format, theme=theme)
+    try:
+        result = await agent.run(goal, output_format=output_format, theme=theme)
+    finally:
+        # 任務中途失敗時也要把 context 還給池，否則池會被耗盡
+        await agent.browser.close()
+        # 先送完進度訊息，確保 done 是最後一則
+        await ws_ui.close()
 
-    await websocket.send_json({
+    await _send_json(websocket, {
         "type": "done",
         "task_id": task_id,
         "mode": "research",
@@ -405,24 +837,27 @@ async def run_research(websocket, ws_ui, task_id, goal, output_format, theme, mo
 
 async def run_code_generation(websocket, task_id, goal, template, theme):
     """執行程式碼生成任務"""
+    from agent.coder import Coder
+
     coder = Coder()
 
-    await websocket.send_json({"type": "phase", "phase": "planning"})
-    await websocket.send_json({"type": "progress", "progress": 5})
+    await _send_json(websocket, {"type": "phase", "phase": "planning"})
+    await _send_json(websocket, {"type": "progress", "progress": 5})
 
-    plan = coder.analyze_task(goal, template)
+    plan = await asyncio.to_thread(coder.analyze_task, goal, template)
     project_name = plan.get("project_name", "monus_project")
 
-    await websocket.send_json({"type": "progress", "progress": 10})
-    await websocket.send_json({
+    await _send_json(websocket, {"type": "progress", "progress": 10})
+    await _send_json(websocket, {
         "type": "step",
         "step": f"Creating project: {project_name}",
         "status": "running"
     })
 
     init_result = await sandbox.init_project(project_name, template)
+    _project_files_cache.pop(project_name, None)
 
-    await websocket.send_json({
+    await _send_json(websocket, {
         "type": "project_created",
         "project_name": project_name,
         "files": init_result.get("files", [])
@@ -431,8 +866,10 @@ async def run_code_generation(websocket, task_id, goal, template, theme):
     files_to_create = plan.get("files", [])
     total_files = len(files_to_create)
     existing_files = {}
+    # 百分比有變才送進度，檔案很多時不必每個檔案都送
+    last_progress = 10
 
-    await websocket.send_json({"type": "phase", "phase": "writing"})
+    await _send_json(websocket, {"type": "phase", "phase": "writing"})
 
     for i, file_info in enumerate(files_to_create):
         file_path = file_info.get("path", "")
@@ -441,49 +878,44 @@ async def run_code_generation(websocket, task_id, goal, template, theme):
         if not file_path:
             continue
 
-        await websocket.send_json({"type": "file_start", "file": file_path})
+        await _send_json(websocket, {"type": "file_start", "file": file_path})
 
         progress = 10 + int(((i + 1) / total_files) * 80)
-        await websocket.send_json({"type": "progress", "progress": progress})
-        await websocket.send_json({
+        if progress != last_progress:
+            last_progress = progress
+            await _send_json(websocket, {"type": "progress", "progress": progress})
+        await _send_json(websocket, {
             "type": "step",
             "step": f"Generating {file_path}",
             "status": "running"
         })
 
-        content = ""
-        for chunk in coder.generate_file(
+        content = await _stream_file(websocket, file_path, coder.generate_file(
             goal=goal,
             file_path=file_path,
             file_description=file_desc,
             existing_files=existing_files
-        ):
-            content += chunk
-            await websocket.send_json({
-                "type": "file_chunk",
-                "file": file_path,
-                "chunk": chunk
-            })
+        ))
 
-        await sandbox.write_file(project_name, file_path, content)
+        await _write_project_file(project_name, file_path, content)
         existing_files[file_path] = content
 
-        await websocket.send_json({
+        await _send_json(websocket, {
             "type": "file_complete",
             "file": file_path,
             "content": content
         })
 
-        await websocket.send_json({
+        await _send_json(websocket, {
             "type": "step",
             "step": f"Generated {file_path}",
             "status": "done"
         })
 
-    await websocket.send_json({"type": "progress", "progress": 100})
-    await websocket.send_json({"type": "phase", "phase": "complete"})
+    await _send_json(websocket, {"type": "progress", "progress": 100})
+    await _send_json(websocket, {"type": "phase", "phase": "complete"})
 
-    await websocket.send_json({
+    await _send_json(websocket, {
         "type": "done",
         "task_id": task_id,
         "mode": "code",
@@ -499,10 +931,14 @@ async def run_code_generation(websocket, task_id, goal, template, theme):
 # ==================== Code Generator (Legacy) ====================
 
 
+# 聊天訊息含這些關鍵字時視為修改檔案的請求（一次線性掃描比對全部關鍵字）
+MODIFY_RE = re.compile("改|加|修|刪|換|update|add|modify|change")
+
+
 @app.get("/code")
 async def code_page():
     """Code Generator 頁面"""
-    return FileResponse(Path(__file__).parent / "static" / "code.html")
+    return FileResponse(CODE_HTML)
 
 
 @app.websocket("/ws/code")
@@ -510,14 +946,18 @@ async def code_websocket(websocket: WebSocket):
     """Code Generation WebSocket - 即時生成程式碼"""
     await websocket.accept()
 
+    from agent.coder import Coder
+
     coder = Coder()
     project_name = None
     goal = ""
     template = "html"
+    # 修改請求的目標檔案，同一個專案只需找一次（重新 start 時清除）
+    target_file = None
 
     try:
         while True:
-            data = await websocket.receive_json()
+            data = await _receive_json(websocket)
             msg_type = data.get("type", "")
 
             if msg_type == "start":
@@ -526,29 +966,31 @@ async def code_websocket(websocket: WebSocket):
                 template = data.get("template", "html")
 
                 if not goal:
-                    await websocket.send_json({"type": "error", "message": "Goal is required"})
+                    await _send_json(websocket, {"type": "error", "message": "Goal is required"})
                     continue
 
                 # 分析任務
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "progress",
                     "percent": 5,
                     "message": "Analyzing task..."
                 })
 
-                plan = coder.analyze_task(goal, template)
+                plan = await asyncio.to_thread(coder.analyze_task, goal, template)
                 project_name = plan.get("project_name", "monus_project")
+                target_file = None
 
                 # 初始化專案
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "progress",
                     "percent": 10,
                     "message": "Creating project..."
                 })
 
                 init_result = await sandbox.init_project(project_name, template)
+                _project_files_cache.pop(project_name, None)
 
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "project_created",
                     "project_name": project_name,
                     "files": init_result.get("files", [])
@@ -567,57 +1009,50 @@ async def code_websocket(websocket: WebSocket):
                         continue
 
                     # 通知開始生成
-                    await websocket.send_json({
+                    await _send_json(websocket, {
                         "type": "file_start",
                         "file": file_path
                     })
 
                     progress = 10 + int((i / total_files) * 80)
-                    await websocket.send_json({
+                    await _send_json(websocket, {
                         "type": "progress",
                         "percent": progress,
                         "message": f"Generating {file_path}..."
                     })
 
                     # 串流生成檔案
-                    content = ""
-                    for chunk in coder.generate_file(
+                    content = await _stream_file(websocket, file_path, coder.generate_file(
                         goal=goal,
                         file_path=file_path,
                         file_description=file_desc,
                         existing_files=existing_files
-                    ):
-                        content += chunk
-                        await websocket.send_json({
-                            "type": "file_chunk",
-                            "file": file_path,
-                            "chunk": chunk
-                        })
+                    ))
 
                     # 儲存檔案
-                    await sandbox.write_file(project_name, file_path, content)
+                    await _write_project_file(project_name, file_path, content)
                     existing_files[file_path] = content
 
-                    await websocket.send_json({
+                    await _send_json(websocket, {
                         "type": "file_complete",
                         "file": file_path,
                         "content": content
                     })
 
                 # 完成
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "progress",
                     "percent": 100,
                     "message": "Complete!"
                 })
 
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "complete",
                     "project_name": project_name
                 })
 
                 # 預覽 URL
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "preview_ready",
                     "url": f"/sandbox/{project_name}/index.html"
                 })
@@ -630,72 +1065,57 @@ async def code_websocket(websocket: WebSocket):
                     continue
 
                 # 判斷是修改檔案還是一般對話
-                if project_name and any(kw in message for kw in ["改", "加", "修", "刪", "換", "update", "add", "modify", "change"]):
+                if project_name and MODIFY_RE.search(message):
                     # 修改現有檔案
                     # 找出要修改的檔案（簡單邏輯：找最相關的）
-                    files_result = await sandbox.list_files(project_name)
-                    files = files_result.get("files", [])
-
-                    # 預設修改主要檔案
-                    target_file = None
-                    for f in files:
-                        if f.get("type") == "file":
-                            path = f.get("path", "")
-                            if "script" in path or "app" in path or path.endswith(".js") or path.endswith(".jsx"):
-                                target_file = path
-                                break
-                            if path == "index.html":
-                                target_file = path
+                    if target_file is None:
+                        target_file = _pick_target_file(await _list_project_files(project_name))
 
                     if target_file:
                         read_result = await sandbox.read_file(project_name, target_file)
                         current_content = read_result.get("content", "")
 
-                        await websocket.send_json({
+                        await _send_json(websocket, {
                             "type": "file_start",
                             "file": target_file
                         })
 
                         # 修改檔案
-                        new_content = ""
-                        for chunk in coder.modify_file(
+                        new_content = await _stream_file(websocket, target_file, coder.modify_file(
                             goal=goal,
                             file_path=target_file,
                             current_content=current_content,
                             modification_request=message
-                        ):
-                            new_content += chunk
-                            await websocket.send_json({
-                                "type": "file_chunk",
-                                "file": target_file,
-                                "chunk": chunk
-                            })
+                        ))
 
-                        await sandbox.write_file(project_name, target_file, new_content)
+                        # 模型原樣回傳時不必重寫檔案
+                        if new_content != current_content:
+                            await _write_project_file(project_name, target_file, new_content)
 
-                        await websocket.send_json({
+                        await _send_json(websocket, {
                             "type": "file_complete",
                             "file": target_file,
                             "content": new_content
                         })
 
-                        await websocket.send_json({
+                        await _send_json(websocket, {
                             "type": "chat",
                             "message": f"Done! Updated `{target_file}`"
                         })
                     else:
-                        await websocket.send_json({
+                        await _send_json(websocket, {
                             "type": "chat",
                             "message": "No file to modify. Try being more specific."
                         })
 
                 else:
                     # 一般對話
-                    response = ""
-                    for chunk in coder.chat(message, {"project": project_name, "goal": goal}):
-                        response += chunk
+                    parts = []
+                    async for chunk in _iter_in_thread(coder.chat(message, {"project": project_name, "goal": goal})):
+                        parts.append(chunk)
+                    response = "".join(parts)
 
-                    await websocket.send_json({
+                    await _send_json(websocket, {
                         "type": "chat",
                         "message": response
                     })
@@ -706,8 +1126,8 @@ async def code_websocket(websocket: WebSocket):
                 content = data.get("content", "")
 
                 if project_name and file_path:
-                    await sandbox.write_file(project_name, file_path, content)
-                    await websocket.send_json({
+                    await _write_project_file(project_name, file_path, content)
+                    await _send_json(websocket, {
                         "type": "terminal",
                         "output": f"Saved: {file_path}"
                     })
@@ -715,24 +1135,34 @@ async def code_websocket(websocket: WebSocket):
     except WebSocketDisconnect:
         print("[Code] WebSocket disconnected")
     except Exception as e:
-        await websocket.send_json({
+        await _send_json(websocket, {
             "type": "error",
             "message": str(e)
         })
 
 
 # Sandbox 靜態檔案（預覽用）
-sandbox_path = Path(__file__).parent.parent / "sandbox_workspace"
-sandbox_path.mkdir(parents=True, exist_ok=True)
-app.mount("/sandbox", StaticFiles(directory=str(sandbox_path), html=True), name="sandbox")
+SANDBOX_DIR.mkdir(parents=True, exist_ok=True)
+app.mount("/sandbox", StaticFiles(directory=str(SANDBOX_DIR), html=True), name="sandbox")
 
 
 # 靜態前端檔案
-static_path = Path(__file__).parent / "static"
-if static_path.exists():
-    app.mount("/static", StaticFiles(directory=str(static_path)), name="static")
+if STATIC_DIR.exists():
+    app.mount("/static", StaticFiles(directory=str(STATIC_DIR), html=True, check_dir=False), name="static")
+
+
+# uvicorn worker 數，預設 1；每條 WebSocket 只會落在一個 worker，行程內狀態不需共用
+# 每個 worker 都會跑 lifespan（重建索引）並各自持有最多 MONUS_BROWSER_POOL_SIZE 個 Chromium
+WEB_WORKERS = int(os.environ.get("MONUS_WEB_WORKERS", "1"))
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # loop / http 維持 auto：有安裝 uvloop、httptools（uvicorn[standard]）時會自動採用
+    # WebSocket 多為小 frame，壓縮效果差又吃 CPU 與每連線記憶體，關閉 permessage-deflate
+    run_kwargs = {"host": "0.0.0.0", "port": 8000, "ws_per_message_deflate": False}
+    if WEB_WORKERS > 1:
+        # 多 worker 需以 import 字串讓各子行程自行載入 app
+        uvicorn.run("web.server:app", workers=WEB_WORKERS, **run_kwargs)
+    else:
+        uvicorn.run(app, **run_kwargs)